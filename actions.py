@@ -130,8 +130,8 @@ class SpawnPlayer(Action):
         # [last_shot, cooldown, image_index]
         barrels = [[0, 0.2, 0]]
         game.add_component(self.player_id, "barrel manager", barrels, False, "bullet_player", game.get_component(self.player_id, "graphics"), game.get_component(self.player_id, "transform"), game.get_component(self.player_id, "animator"))
-        # Collider: [collision_check_id, radius, offset, collision_category, collidable_width, transform_component]
-        game.add_component(self.player_id, "collider", self.player_id, 21 * game.get_component(self.player_id, "transform").scale, Vector2(0, 0), "actors", ["particles"], "body_player", game.get_component(self.player_id, "transform"))
+        # Collider: [collision_check_id, radius, offset, collision_category, transform_component]
+        game.add_component(self.player_id, "collider", self.player_id, 21 * game.get_component(self.player_id, "transform").scale, Vector2(0, 0), "actors", "body_player", game.get_component(self.player_id, "transform"))
         game.add_component(self.player_id, "health bar", 50, 10, Vector2(0, -30), game.get_component(self.player_id, "transform"))
 
 class SpawnEnemy(Action):
@@ -166,8 +166,8 @@ class SpawnEnemy(Action):
         # [scale, angle_offset, last_shot, cooldown, image_index]
         barrels = [[0, 0.2, 0]]
         game.add_component(self.enemy_id, "barrel manager", barrels, False, "bullet_enemy", game.get_component(self.enemy_id, "graphics"), game.get_component(self.enemy_id, "transform"), game.get_component(self.enemy_id, "animator"))
-        # Collider: [collision_check_id, radius, offset, collision_category, collidable_width, transform_component]
-        game.add_component(self.enemy_id, "collider", self.enemy_id, 21 * game.get_component(self.enemy_id, "transform").scale, Vector2(0, 0), "actors", ["particles"], "body_enemy", game.get_component(self.enemy_id, "transform"))
+        # Collider: [collision_check_id, radius, offset, collision_category, transform_component]
+        game.add_component(self.enemy_id, "collider", self.enemy_id, 21 * game.get_component(self.enemy_id, "transform").scale, Vector2(0, 0), "actors", "body_enemy", game.get_component(self.enemy_id, "transform"))
         game.add_component(self.enemy_id, "health bar", 50, 10, Vector2(0, -30), game.get_component(self.enemy_id, "transform"))
 
 class SpawnBullet(Action):
@@ -185,6 +185,7 @@ class SpawnBullet(Action):
     
     def execute_action(self, game):
         if not game.is_alive(self.owner_id):
+            game.release_id(self.bullet_id)
             return
         game.create_entity(self.bullet_id)
         game.add_component(self.bullet_id, "transform", self.spawn_point.x, self.spawn_point.y, self.rotation, self.scale)
@@ -192,8 +193,8 @@ class SpawnBullet(Action):
         game.add_component(self.bullet_id, "physics", self.angle, (self.speed, self.speed, self.speed), self.rotational_force, 1, 1, 0, game.get_component(self.bullet_id, "transform"))
         game.add_component(self.bullet_id, "animator", "bullet", [], game.get_component(self.bullet_id, "graphics"), game.get_component(self.bullet_id, "transform"))
         game.add_component(self.bullet_id, "life timer", time.time(), 3, game.get_component(self.bullet_id, "animator"))
-        # Collider: [collision_check_id, radius, offset, collision_category, collidable_width, transform_component]
-        game.add_component(self.bullet_id, "collider", self.owner_id, 10, Vector2(0, 0), "projectiles", ["actors", "projectiles", "shapes"], self.projectile_name, game.get_component(self.bullet_id, "transform"))
+        # Collider: [collision_check_id, radius, offset, collision_category, transform_component]
+        game.add_component(self.bullet_id, "collider", self.owner_id, 10, Vector2(0, 0), "projectiles", self.projectile_name, game.get_component(self.bullet_id, "transform"), fast=True)
         game.add_property(self.bullet_id, "damage", game.get_property(self.owner_id, "damage"))
 
 class SpawnShape(Action):
@@ -212,8 +213,8 @@ class SpawnShape(Action):
         game.add_component(self.shape_id, "transform", self.spawn_point.x, self.spawn_point.y, self.rotation, self.scale)
         game.add_component(self.shape_id, "graphics", 0, [(game.images["square_small"], Vector2(0, 0), 0, 1)], game.get_component(self.shape_id, "transform"))
         game.add_component(self.shape_id, "physics", self.rotation, (0, 0, 0), self.spin_rate, 1, 0.7, settings.PARTICLE_FRICTION, game.get_component(self.shape_id, "transform"), self.spin_friction)
-        # Collider: [collision_check_id, radius, offset, collision_category, collidable_width, transform_component]
-        game.add_component(self.shape_id, "collider", self.shape_id, 8, Vector2(0, 0), "shapes", [], "", game.get_component(self.shape_id, "transform"))
+        # Collider: [collision_check_id, radius, offset, collision_category, transform_component]
+        game.add_component(self.shape_id, "collider", self.shape_id, 8, Vector2(0, 0), "shapes", "", game.get_component(self.shape_id, "transform"))
         game.add_property(self.shape_id, "xp", self.xp)
         game.add_property(self.shape_id, "health", 30)
 
@@ -247,7 +248,7 @@ class SpawnParticle(Action):
                 radius = 6 * self.scale
             elif "particle_3" in self.image_string:
                 radius = 3 * self.scale
-            game.add_component(self.particle_id, "collider", self.particle_id, radius, Vector2(0, 0), "particles", [], "", game.get_component(self.particle_id, "transform"))
+            game.add_component(self.particle_id, "collider", self.particle_id, radius, Vector2(0, 0), "particles", "", game.get_component(self.particle_id, "transform"))
 
 class StartFiringBarrels(Action):
     def __init__(self, id):
@@ -383,7 +384,12 @@ class ActionHandler:
         self.actions.append(action)
     
     def handle_actions(self):
+        # Actions added while handling are handled too, so once this is done nothing queued can still
+        # need an id given out before it started. Any of those that weren't used are given back.
+        unclaimed_ids = set(self.game.get_unclaimed_ids())
         for action in self.actions:
             if action.id == None or self.game.is_alive(action.id):
                 action.execute(self.game)
-        self.actions = []
\ No newline at end of file
+        self.actions = []
+        if unclaimed_ids:
+            self.game.release_unclaimed_ids(unclaimed_ids)
\ No newline at end of file
@@ -0,0 +1,113 @@
+import math
+import pygame
+from collections import OrderedDict
+import colors
+import settings
+
+class Background:
+    """Draws the grid behind everything. Grids with cells of at least `tile_below` pixels are drawn by filling
+    the screen and then filling each line as a rect one pixel wide. Finer ones are drawn from one surface a
+    tile bigger than the screen, which is only drawn again when the screen changes size. Each frame it is
+    blitted shifted by the camera's offset into a tile, so it is one blit however small the grid is. Copying
+    a whole screen costs more than filling it though, so that's only worth it once there are lots of lines.
+
+    Bigger things in the world that never change (ie an arena wall) can be added as features. They are
+    drawn into chunks of the world as each chunk first comes on screen, and the chunks are kept."""
+
+    def __init__(self, grid_size=settings.GRID_SIZE, color=colors.white, line_color=colors.light_gray,
+            chunk_size=settings.BACKGROUND_CHUNK_SIZE, max_chunks=settings.BACKGROUND_MAX_CHUNKS,
+            tile_below=settings.BACKGROUND_TILE_BELOW):
+        self.grid_size = grid_size
+        self.tile_below = tile_below
+        self.color = color
+        self.line_color = line_color
+        self.size = None
+        self.surface = None
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        # draw(<chunk surface>, <chunk's world rect>) for each feature
+        self.features = []
+        # (<chunk x>, <chunk y>): <surface>, oldest first. Chunks without any feature in them are only
+        # remembered as empty, since they take no room.
+        self.chunks = OrderedDict()
+        self.empty_chunks = set()
+        self.chunks_rendered = 0
+
+    def resize(self, size):
+        """Renders the grid big enough to cover a screen of `size` from anywhere within a tile, if the grid
+        is fine enough to be drawn that way."""
+
+        self.size = size
+        grid_size = self.grid_size
+        if grid_size >= self.tile_below:
+            self.surface = None
+            return
+        width = (math.ceil(size[0] / grid_size) + 1) * grid_size
+        height = (math.ceil(size[1] / grid_size) + 1) * grid_size
+        self.surface = pygame.Surface((width, height))
+        self.surface.fill(self.color)
+        for x in range(0, width, grid_size):
+            pygame.draw.line(self.surface, self.line_color, (x, 0), (x, height))
+        for y in range(0, height, grid_size):
+            pygame.draw.line(self.surface, self.line_color, (0, y), (width, y))
+
+    def add_feature(self, draw):
+        """Adds something to draw into the chunks. It's given each chunk's surface and the part of the
+        world the chunk covers, and should draw whatever of itself is in it, offset by the rect's corner."""
+
+        self.features.append(draw)
+        self.chunks.clear()
+        self.empty_chunks.clear()
+
+    def get_chunk(self, chunk_x, chunk_y):
+        key = (chunk_x, chunk_y)
+        chunks = self.chunks
+        if key in chunks:
+            chunks.move_to_end(key)
+            return chunks[key]
+        if key in self.empty_chunks:
+            return None
+
+        chunk_size = self.chunk_size
+        rect = pygame.Rect(chunk_x * chunk_size, chunk_y * chunk_size, chunk_size, chunk_size)
+        surface = pygame.Surface((chunk_size, chunk_size), pygame.SRCALPHA)
+        for draw in self.features:
+            draw(surface, rect)
+        self.chunks_rendered += 1
+        # Most of the world is empty, and empty chunks don't need to be blitted or kept around
+        if surface.get_bounding_rect().width == 0:
+            self.empty_chunks.add(key)
+            return None
+        chunks[key] = surface
+        while len(chunks) > self.max_chunks:
+            chunks.popitem(last=False)
+        return surface
+
+    def draw(self, screen, corner):
+        """Covers the screen with the background, as seen from a camera with its top left at `corner`."""
+
+        if screen.get_size() != self.size:
+            self.resize(screen.get_size())
+        grid_size = self.grid_size
+        # The grid lines are at whole pixels, so where they land is rounded down like pygame.draw rounds them
+        left = math.floor(-corner[0] % grid_size)
+        top = math.floor(-corner[1] % grid_size)
+        if self.surface is not None:
+            screen.blit(self.surface, (left - grid_size, top - grid_size))
+        else:
+            width, height = self.size
+            screen.fill(self.color)
+            for x in range(left, width, grid_size):
+                screen.fill(self.line_color, (x, 0, 1, height))
+            for y in range(top, height, grid_size):
+                screen.fill(self.line_color, (0, y, width, 1))
+        if not self.features:
+            return
+
+        chunk_size = self.chunk_size
+        width, height = self.size
+        for chunk_y in range(math.floor(corner[1] / chunk_size), math.floor((corner[1] + height) / chunk_size) + 1):
+            for chunk_x in range(math.floor(corner[0] / chunk_size), math.floor((corner[0] + width) / chunk_size) + 1):
+                surface = self.get_chunk(chunk_x, chunk_y)
+                if surface is not None:
+                    screen.blit(surface, (chunk_x * chunk_size - corner[0], chunk_y * chunk_size - corner[1]))
@@ -0,0 +1,752 @@
+import sys
+import math
+import time
+import random
+import tracemalloc
+import gc
+import numpy as np
+import pygame
+import settings
+import state_machine # Has to be imported before main, since they import each other
+import main
+import spatial_hashing
+import background
+import colors
+import sprite_cache
+import q_tree
+import test_physics
+from pygame.math import Vector2
+
+'''
+----------
+BENCHMARKS
+----------
+Run `python benchmarks.py` to run all of them, or `python benchmarks.py <name> [<name>]` for
+specific ones. Each one prints its own results.
+
+physics: Times the batched physics integrator against the original per-object one (test_physics checks that they agree).
+memory: Bytes used per empty pooled component, per entity of each archetype, and the peak of a particle burst.
+pools: How much pool growth happens mid-frame during particle bursts, with and without background growth, and how often short spikes make the pools grow and shrink.
+grid: Inserting, moving and querying, and removing colliders with each of the collision grid managers.
+collisions: Times the batched broadphase and narrowphase and checks them against the original per-collider loop.
+ccd: Fires bullets at shapes during a frame hitch, with and without the swept checks for fast colliders.
+queries: Times the radius, rectangle, and ray queries on each grid manager and checks them against scanning every collider.
+nearest: Finding the nearest enemy with the quad tree and with the collision grid.
+static: The collision pass in a big arena full of still shapes, with and without letting colliders sleep.
+tuning: Tunes the grids of a crowded fight and compares queries before and after.
+pushing: A tank pushes through a packed block of squares, timing every frame of the collision pass.
+sprites: Drawing hundreds of spinning particles of one image, with and without the shared sprite cache.
+render: Draw calls and ms per graphics layer, drawing each layer with one blits call and with a blit per image.
+culling: Finding what's on screen in bigger and bigger worlds, and drawing and animating only that.
+backgrounds: Drawing the grid behind everything line by line, with filled lines, and from a pre-rendered tile, and a ring wall from chunks.
+'''
+
+def create_game(screen_size=(1280, 720), load_assets=False, grid_manager=None):
+    """Makes a game that has no scene manager and draws to an offscreen surface, so systems can be
+    run on their own. Loading the images needs a display mode, so a hidden one is set."""
+
+    game = main.Game(pygame.Surface(screen_size), settings.COLLISION_GRID_WIDTH, None)
+    if grid_manager is not None:
+        # The collision maps are made with the state, so it has to be made again
+        game.grid_manager = grid_manager
+        game.state_container = state_machine.StateContainer(game)
+    if load_assets:
+        if pygame.display.get_surface() is None:
+            pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        game.update_images_and_sounds(main.load_images(), main.load_animation_images(), {})
+    return game
+
+def time_call(func, *args, repeat=1):
+    """Returns the average time in milliseconds that one call of func took."""
+
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def physics(amounts=(1000, 5000), steps=120, dt=1 / 60):
+    """Times both integrators on the same bodies. test_physics checks that they agree."""
+
+    for amount in amounts:
+        random.seed(amount)
+        game = create_game()
+        ids = test_physics.spawn_bodies(game, amount)
+        bodies = test_physics.copy_bodies(game, ids)
+        system = game.get_systems()["physics"]
+
+        batched_ms = time_call(system.update, dt, repeat=steps)
+        reference_ms = time_call(test_physics.reference_physics_step, bodies, dt, repeat=steps)
+        max_error = test_physics.get_max_error(game, bodies)
+        print(f"physics: {amount} bodies, batched {batched_ms:.3f} ms/step, per-object {reference_ms:.3f} ms/step, "
+            f"max error after {steps} steps {max_error:.2e}")
+
+def measure_memory(func, *args):
+    """Returns the bytes still allocated after calling func, and the peak during the call."""
+
+    tracemalloc.start()
+    func(*args)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak
+
+def spawn_archetype(game, archetype, amount, owner_id=None):
+    """Spawns entities the same way the game does through their actions."""
+
+    actions = game.actions
+    ids = []
+    for i in range(amount):
+        id = game.get_unique_id()
+        spawn_point = Vector2(random.uniform(-1000, 1000), random.uniform(-1000, 1000))
+        if archetype == "player":
+            action = actions.SpawnPlayer(id, spawn_point, 0, 1, settings.PLAYER_MAX_SPEED, settings.PLAYER_ACCEL, settings.PLAYER_DECEL, settings.PLAYER_FRICTION)
+        elif archetype == "enemy":
+            action = actions.SpawnEnemy(id, spawn_point, 0, 1, settings.PLAYER_MAX_SPEED, settings.PLAYER_ACCEL, settings.PLAYER_DECEL, settings.PLAYER_FRICTION)
+        elif archetype == "bullet":
+            action = actions.SpawnBullet(id, owner_id, spawn_point, 0, 1, random.uniform(0, 360), settings.PLAYER_MAX_SPEED + 10, "bullet_player")
+        elif archetype == "particle":
+            speed = random.uniform(50, 500)
+            action = actions.SpawnParticle(id, "particle_enemy", spawn_point, random.uniform(0, 360), 1, [speed, speed, 0], 0.05, 5, random.uniform(10, 50))
+        elif archetype == "shape":
+            action = actions.SpawnShape(id, spawn_point, random.uniform(0, 360), 1, 10, 5, False)
+        action.execute_action(game)
+        ids.append(id)
+    return ids
+
+def memory(amount=5000):
+    """Pools are grown before measuring each archetype, so the numbers are just what a live entity
+    adds on top of its already allocated components."""
+
+    game = create_game(load_assets=True)
+    for name, system in game.get_systems().items():
+        size, peak = measure_memory(system.partition, game, amount)
+        print(f"memory: empty {name} component {size / amount:.0f} bytes")
+
+    random.seed(0)
+    game = create_game(load_assets=True)
+    for system in game.get_systems().values():
+        system.partition(game, amount + 10)
+    game.get_entity_props().grow(amount + 10)
+    owner_id = spawn_archetype(game, "player", 1)[0]
+    for archetype in ["player", "enemy", "bullet", "particle", "shape"]:
+        ids = []
+        size, peak = measure_memory(lambda: ids.extend(spawn_archetype(game, archetype, amount, owner_id)))
+        print(f"memory: {archetype} entity {size / amount:.0f} bytes")
+        for id in ids:
+            game.destroy_entity(id)
+
+    game = create_game(load_assets=True)
+    size, peak = measure_memory(spawn_archetype, game, "particle", amount)
+    print(f"memory: burst of {amount} particles from the default pool sizes, peak {peak / 1024:.0f} KiB, kept {size / 1024:.0f} KiB")
+
+def pools(burst=3000, frames=120, bursts=4):
+    """Spawns a burst of particles every `frames` frames and trickles more in between, destroying each
+    burst before the next one like their life timers would. maintain_pools() is called at the end of
+    each frame like the scene manager does. Prints how much growth had to happen mid-frame, and the
+    slowest frames, which is where any garbage collection the growth sets off shows up."""
+
+    for background in [False, True]:
+        random.seed(0)
+        game = create_game(load_assets=True)
+        # Like the scene manager does when a state starts
+        game.collect_garbage()
+        events = []
+        game.instrumentation.add_listener(events.append)
+        alive = []
+        frame_ms = []
+        for frame in range(frames * bursts):
+            start = time.perf_counter()
+            if frame % frames == 0:
+                for id in alive:
+                    game.destroy_entity(id)
+                alive = spawn_archetype(game, "particle", burst)
+            else:
+                alive += spawn_archetype(game, "particle", burst // frames)
+            if background:
+                game.maintain_pools()
+            frame_ms.append((time.perf_counter() - start) * 1000)
+        
+        label = "background growth" if background else "no background growth"
+        # The frames with a burst in them are slow anyway, so the frames in between are what growing in the background should keep smooth
+        between = [ms for frame, ms in enumerate(frame_ms) if frame % frames != 0]
+        print(f"pools: {label}, slowest burst frame {max(frame_ms[::frames]):.2f} ms, slowest frame between bursts {max(between):.2f} ms, "
+            f"average between bursts {sum(between) / len(between):.2f} ms")
+        for reason in ["full", "background"]:
+            growths = [event for event in events if event["kind"] == "pool growth" and event["reason"] == reason]
+            if growths:
+                print(f"pools: {label}, {len(growths)} '{reason}' growths, {sum(event['ms'] for event in growths):.1f} ms total, "
+                    f"slowest {max(event['ms'] for event in growths):.2f} ms")
+        collections = [event for event in events if event["kind"] == "garbage collection"]
+        if collections:
+            print(f"pools: {label}, {len(collections)} garbage collections, {sum(event['collected'] for event in collections)} objects collected, "
+                f"slowest {max(event['ms'] for event in collections):.2f} ms")
+        print(f"pools: {label}, final physics pool size {len(game.get_systems()['physics'].components)}, {gc.get_freeze_count()} objects frozen")
+    
+    # Short spikes a few seconds apart, and then a quiet spell, which shouldn't shrink and regrow the pools every spike
+    random.seed(0)
+    game = create_game(load_assets=True)
+    events = []
+    game.instrumentation.add_listener(events.append)
+    alive = []
+    for frame in range(frames * 25):
+        if frame % (frames * 2) == 0 and frame < frames * 12:
+            alive = spawn_archetype(game, "particle", burst)
+        elif frame % (frames * 2) == frames // 4:
+            for id in alive:
+                game.destroy_entity(id)
+            alive = []
+        game.maintain_pools()
+    growths = [event for event in events if event["kind"] == "pool growth"]
+    shrinks = [event for event in events if event["kind"] == "pool shrink"]
+    print(f"pools: spikes, {len(growths)} growths ({sum(event['reason'] == 'full' for event in growths)} 'full'), {len(shrinks)} shrinks, "
+        f"slowest shrink {max((event['ms'] for event in shrinks), default=0):.2f} ms")
+
+def spawn_colliders(game, amount, spawn_range, category="particles"):
+    """Creates entities with only a transform and a collider, sized like the game's colliders."""
+
+    ids = []
+    for i in range(amount):
+        id = game.get_unique_id()
+        game.create_entity(id)
+        game.add_component(id, "transform", random.uniform(-spawn_range, spawn_range), random.uniform(-spawn_range, spawn_range), 0, 1)
+        game.add_component(id, "collider", id, random.choice([3, 6, 10, 21]), Vector2(), category, None,
+            game.get_component(id, "transform"))
+        ids.append(id)
+    return ids
+
+def grid(amounts=(1000, 5000, 20000), frames=60, speed=4):
+    """Each collider moves up to `speed` pixels a frame, which is about what bullets and tanks do.
+    The colliders are spread out so that there are roughly the same number per cell at every amount.
+    Each frame they're moved like the collision pass moves them, and then one query is made, since
+    the flat grids only catch up with the colliders when they're next queried."""
+
+    for amount in amounts:
+        spawn_range = int((amount ** 0.5) * 20)
+        for name, grid_manager in spatial_hashing.grid_managers.items():
+            random.seed(amount)
+            game = create_game(grid_manager=grid_manager)
+            start = time.perf_counter()
+            ids = spawn_colliders(game, amount, spawn_range)
+            insert_ms = (time.perf_counter() - start) * 1000
+
+            system = game.get_systems()["collider"]
+            columns = game.get_systems()["transform"].columns
+            collision_map = game.get_collision_maps()["particles"]
+            move_ms = 0
+            for frame in range(frames):
+                columns.x[:amount] += [random.uniform(-speed, speed) for i in range(amount)]
+                columns.y[:amount] += [random.uniform(-speed, speed) for i in range(amount)]
+                start = time.perf_counter()
+                collision_map.move_colliders(system, np.arange(system.live_count))
+                collision_map.query_radius((0, 0), 100)
+                move_ms += (time.perf_counter() - start) * 1000
+
+            remove_ms = time_call(lambda: [game.destroy_entity(id) for id in ids])
+            print(f"grid: {name}, {amount} colliders, insert {insert_ms:.1f} ms, move and query {move_ms / frames:.2f} ms/frame, "
+                f"remove {remove_ms:.1f} ms, {len(collision_map.query_rect((-spawn_range, -spawn_range, spawn_range * 2, spawn_range * 2)))} colliders left")
+
+def reference_collision_pass(game):
+    """The original per-collider search through the collision maps, where each collider looked through
+    the categories it could collide with. Gives the (collider, other) slots of every contact it finds."""
+
+    collidable_categories = {category:[] for category in settings.COLLISION_CATEGORIES}
+    for a, b in settings.COLLIDING_CATEGORIES:
+        collidable_categories[a].append(b)
+    contacts = set()
+    for component in game.get_systems()["collider"].components[:game.get_systems()["collider"].live_count]:
+        if not component.inactive:
+            transform = component.transform_component
+            origin = Vector2(transform.x, transform.y) + component.offset
+            colliding_with_set = set().union(*[game.get_collision_maps()[c].contents.get(cell)
+                    for cell in component.collision_cells for c in collidable_categories[component.collision_category]
+                    if game.get_collision_maps()[c].contents.get(cell) != None])
+            colliding_with_set -= {component}
+            for other_collider in colliding_with_set:
+                other_transform = other_collider.transform_component
+                other_origin = Vector2(other_transform.x, other_transform.y) + other_collider.offset
+                if component.collision_id != other_collider.collision_id and not other_collider.inactive and origin.distance_squared_to(other_origin) < (component.radius + other_collider.radius) ** 2:
+                    contacts.add((component.slot, other_collider.slot))
+    return contacts
+
+def spawn_collision_scene(game, amount):
+    """A mix of tanks, bullets, shapes, and particles, like the middle of a fight."""
+
+    owner_id = spawn_archetype(game, "player", 1)[0]
+    spawn_archetype(game, "enemy", amount // 50)
+    spawn_archetype(game, "bullet", amount // 5, owner_id)
+    spawn_archetype(game, "shape", amount // 5)
+    spawn_archetype(game, "particle", amount - amount // 50 - 2 * (amount // 5) - 1)
+
+def collisions(amounts=(1000, 5000), repeat=10):
+    for amount in amounts:
+        random.seed(amount)
+        # The original pass looked through the sets in the cells of the hash grids
+        game = create_game(load_assets=True, grid_manager=spatial_hashing.GridManager)
+        spawn_collision_scene(game, amount)
+        system = game.get_systems()["collider"]
+        for component in system.components[:system.live_count]:
+            game.get_collision_maps()[component.collision_category].move_collider(component)
+
+        batched_ms = time_call(lambda: system.find_contacts(*system.find_candidate_pairs()), repeat=repeat)
+        reference_ms = time_call(reference_collision_pass, game, repeat=repeat)
+        colliders, others, times = system.find_contacts(*system.find_candidate_pairs())
+        contacts = set(zip(colliders.tolist(), others.tolist()))
+        # The original found projectiles hitting each other from both sides
+        contacts |= {(other, collider) for collider, other in contacts
+            if (system.components[other].collision_category, system.components[collider].collision_category) in settings.COLLIDING_CATEGORIES}
+        reference = reference_collision_pass(game)
+        print(f"collisions: {amount} colliders, batched {batched_ms:.2f} ms, per-collider {reference_ms:.2f} ms, {len(contacts)} contacts")
+        if contacts != reference:
+            raise AssertionError(f"The batched collision pass found {len(contacts - reference)} extra and missed {len(reference - contacts)} contacts.")
+
+def ccd(amount=200, dt=0.25):
+    """Each bullet is fired straight at a shape from far enough away that one hitched step carries it
+    past the shape. Prints how many bullets hit, and how far from the shape's edge the hits were."""
+
+    for fast in [False, True]:
+        random.seed(0)
+        game = create_game()
+        system = game.get_systems()["collider"]
+        speed = settings.PLAYER_MAX_SPEED + 10
+        bullets = []
+        for i in range(amount):
+            target = Vector2(i * 100, random.uniform(-5, 5))
+            shape_id = game.get_unique_id()
+            game.create_entity(shape_id)
+            game.add_component(shape_id, "transform", target.x, target.y, 0, 1)
+            game.add_component(shape_id, "collider", shape_id, 8, Vector2(), "shapes", "", game.get_component(shape_id, "transform"))
+
+            bullet_id = game.get_unique_id()
+            game.create_entity(bullet_id)
+            game.add_component(bullet_id, "transform", target.x, target.y - speed * dt * random.uniform(0.3, 0.7), 0, 1)
+            game.add_component(bullet_id, "physics", 90, (speed, speed, speed), 0, 1, 1, 0, game.get_component(bullet_id, "transform"))
+            game.add_component(bullet_id, "collider", bullet_id, 10, Vector2(), "projectiles", "", game.get_component(bullet_id, "transform"), fast=fast)
+            bullets.append((target, game.get_component(bullet_id, "collider")))
+
+        game.get_systems()["physics"].update(dt)
+        colliders, others, times = system.find_contacts(*system.find_candidate_pairs())
+        system.move_to_impacts({collider:time for collider, time in zip(colliders.tolist(), times.tolist())})
+        hits = set(colliders.tolist())
+        gaps = [abs((Vector2(collider.transform_component.x, collider.transform_component.y) - target).length() - 18)
+            for target, collider in bullets if collider.slot in hits]
+        label = "swept" if fast else "discrete"
+        print(f"ccd: {label}, {len(hits)} of {amount} bullets hit" + (f", furthest hit from the shape's edge {max(gaps):.2e} px" if gaps else ""))
+
+def brute_force_queries(game, category, circle, rect, ray):
+    """Answers the same queries as the grid by checking every collider."""
+
+    pos, radius = circle
+    origin, direction, max_distance = ray
+    direction = Vector2(direction).normalize()
+    rect = pygame.Rect(rect)
+    system = game.get_systems()["collider"]
+    by_radius, by_rect, by_ray = [], [], []
+    for collider in system.components[:system.live_count]:
+        if collider.collision_category != category or collider.inactive:
+            continue
+        center = Vector2(collider.transform_component.x, collider.transform_component.y) + collider.offset
+        if center.distance_to(pos) <= radius + collider.radius:
+            by_radius.append((center.distance_to(pos), collider.id))
+        closest = Vector2(min(max(center.x, rect.left), rect.right), min(max(center.y, rect.top), rect.bottom))
+        if center.distance_squared_to(closest) <= collider.radius ** 2:
+            by_rect.append((center.distance_to(rect.center), collider.id))
+        # Where the ray comes closest to the center
+        along = (center - Vector2(origin)).dot(direction)
+        miss_squared = center.distance_squared_to(Vector2(origin) + direction * along)
+        if miss_squared <= collider.radius ** 2:
+            distance = max(along - (collider.radius ** 2 - miss_squared) ** 0.5, 0)
+            # Circles behind the ray only count if it starts inside them
+            if distance <= max_distance and (along >= 0 or center.distance_to(origin) <= collider.radius):
+                by_ray.append((distance, collider.id))
+    return [[id for distance, id in sorted(found)] for found in [by_radius, by_rect, by_ray]]
+
+def queries(amount=10000, repeat=200):
+    for name, grid_manager in spatial_hashing.grid_managers.items():
+        random.seed(amount)
+        game = create_game(grid_manager=grid_manager)
+        spawn_range = int((amount ** 0.5) * 20)
+        spawn_colliders(game, amount, spawn_range)
+        collision_map = game.get_collision_maps()["particles"]
+        circles = [(Vector2(random.uniform(-spawn_range, spawn_range), random.uniform(-spawn_range, spawn_range)), random.uniform(10, 300)) for i in range(repeat)]
+        rects = [(random.uniform(-spawn_range, spawn_range), random.uniform(-spawn_range, spawn_range), random.uniform(10, 600), random.uniform(10, 600)) for i in range(repeat)]
+        rays = [(Vector2(random.uniform(-spawn_range, spawn_range), random.uniform(-spawn_range, spawn_range)), Vector2(1, 0).rotate(random.uniform(0, 360)), random.uniform(100, 1000)) for i in range(repeat)]
+
+        radius_ms = time_call(lambda: [collision_map.query_radius(*circle) for circle in circles]) / repeat
+        rect_ms = time_call(lambda: [collision_map.query_rect(rect) for rect in rects]) / repeat
+        ray_ms = time_call(lambda: [collision_map.raycast(*ray) for ray in rays]) / repeat
+        brute_force_ms = time_call(lambda: [brute_force_queries(game, "particles", circle, rect, ray) for circle, rect, ray in zip(circles, rects, rays)]) / repeat / 3
+        print(f"queries: {name}, {amount} colliders, radius {radius_ms:.3f} ms, rect {rect_ms:.3f} ms, ray {ray_ms:.3f} ms, "
+            f"scanning every collider {brute_force_ms:.3f} ms per query")
+        
+        for circle, rect, ray in zip(circles, rects, rays):
+            expected = brute_force_queries(game, "particles", circle, rect, ray)
+            found = [game.query_radius("particles", *circle), game.query_rect("particles", rect), game.raycast("particles", *ray)]
+            for kind, expected_ids, found_ids in zip(["radius", "rect", "ray"], expected, found):
+                if expected_ids != found_ids:
+                    raise AssertionError(f"{name} {kind} query gave {found_ids} instead of {expected_ids}.")
+
+def grid_nearest(game, category, pos):
+    """The nearest collider to pos found by asking the grid for bigger and bigger circles."""
+
+    radius = settings.COLLISION_GRID_WIDTH
+    while True:
+        ids = game.query_radius(category, pos, radius)
+        if ids:
+            transform = game.get_component(ids[0], "transform")
+            if Vector2(transform.x, transform.y).distance_to(pos) <= radius:
+                return ids[0]
+        radius *= 2
+
+def nearest(amount=10000, searches=1000, frames=30, speed=4):
+    """Each search is for the nearest enemy to a random point. The tree is also kept up to date
+    while every enemy moves a little each frame, like it would be in game."""
+
+    random.seed(amount)
+    game = create_game()
+    spawn_range = int((amount ** 0.5) * 20)
+    ids = spawn_colliders(game, amount, spawn_range, "actors")
+    transforms = [game.get_component(id, "transform") for id in ids]
+    points = [Vector2(random.uniform(-spawn_range, spawn_range), random.uniform(-spawn_range, spawn_range)) for i in range(searches)]
+
+    tree = q_tree.QuadTree()
+    build_ms = time_call(tree.build, [(id, transform.x, transform.y) for id, transform in zip(ids, transforms)])
+    tree_ms = time_call(lambda: [tree.nearest(point) for point in points]) / searches
+    grid_ms = time_call(lambda: [grid_nearest(game, "actors", point) for point in points]) / searches
+    for point in points:
+        found, expected = tree.nearest(point)[0], grid_nearest(game, "actors", point)
+        if found != expected:
+            raise AssertionError(f"The quad tree found {found} as the nearest to {point} instead of {expected}.")
+
+    move_ms = 0
+    for frame in range(frames):
+        for transform in transforms:
+            transform.x += random.uniform(-speed, speed)
+            transform.y += random.uniform(-speed, speed)
+        positions = [(transform.x, transform.y) for transform in transforms]
+        start = time.perf_counter()
+        for id, position in zip(ids, positions):
+            tree.move(id, position)
+        move_ms += (time.perf_counter() - start) * 1000
+    rebuild_ms = time_call(tree.build, [(id, transform.x, transform.y) for id, transform in zip(ids, transforms)])
+    for point in points[:100]:
+        expected = min(ids, key=lambda id: (game.get_component(id, "transform").x - point.x) ** 2 + (game.get_component(id, "transform").y - point.y) ** 2)
+        if tree.nearest(point)[0] != expected:
+            raise AssertionError(f"The quad tree found the wrong nearest enemy after they moved.")
+
+    print(f"nearest: {amount} enemies, quad tree {tree_ms:.3f} ms, grid {grid_ms:.3f} ms per search, "
+        f"building the tree {build_ms:.1f} ms, moving every enemy {move_ms / frames:.1f} ms/frame, rebuilding {rebuild_ms:.1f} ms")
+
+def static(shapes=4000, bullets=200, frames=120, dt=1 / 60):
+    """The shapes are spread over an arena 10 times the default size, and bullets fly through it.
+    Only the collision pass is timed, after the colliders have had time to fall asleep."""
+
+    sleep_frames = settings.COLLIDER_SLEEP_FRAMES
+    for sleep in [False, True]:
+        random.seed(shapes)
+        settings.COLLIDER_SLEEP_FRAMES = sleep_frames if sleep else math.inf
+        game = create_game(load_assets=True)
+        for i in range(shapes):
+            game.actions.SpawnShape(game.get_unique_id(), Vector2(random.uniform(-10000, 10000), random.uniform(-10000, 10000)),
+                random.uniform(0, 360), 1, 10, 5, False).execute_action(game)
+        owner_id = spawn_archetype(game, "player", 1)[0]
+        physics = game.get_systems()["physics"]
+        colliders = game.get_systems()["collider"]
+        collider_ms = 0
+        for frame in range(frames):
+            if frame % 10 == 0:
+                for i in range(bullets // 10):
+                    game.actions.SpawnBullet(game.get_unique_id(), owner_id, Vector2(random.uniform(-10000, 10000), random.uniform(-10000, 10000)),
+                        0, 1, random.uniform(0, 360), settings.PLAYER_MAX_SPEED + 10, "bullet_player").execute_action(game)
+            physics.update(dt)
+            start = time.perf_counter()
+            colliders.update()
+            if frame >= sleep_frames:
+                collider_ms += (time.perf_counter() - start) * 1000
+            game.action_handler.handle_actions()
+        
+        asleep = int(colliders.columns.asleep[:colliders.live_count].sum())
+        label = "sleeping" if sleep else "no sleeping"
+        print(f"static: {label}, {shapes} shapes, collision pass {collider_ms / (frames - sleep_frames):.2f} ms/frame, {asleep} colliders asleep")
+    settings.COLLIDER_SLEEP_FRAMES = sleep_frames
+
+def tuning(amount=5000, grid_managers=(None, spatial_hashing.HierarchicalGridManager)):
+    """Every collider makes a radius query its own size, like a collider asking what it's touching, so the
+    measured candidates are over the same queries the tuner estimates. The queries are timed on the grids
+    from before and after tuning, taking turns and keeping the fastest of each."""
+
+    for grid_manager in grid_managers:
+        tune_grids(amount, grid_manager)
+
+def tune_grids(amount, grid_manager):
+    random.seed(amount)
+    game = create_game(load_assets=True, grid_manager=grid_manager)
+    label = "flat" if grid_manager is None else "hierarchical"
+    spawn_collision_scene(game, amount)
+    system = game.get_systems()["collider"]
+    searches = [(component.collision_category, (component.transform_component.x, component.transform_component.y), component.radius)
+        for component in system.components[:system.live_count]]
+    def search(collision_maps):
+        return [collision_maps[category].query_radius(pos, radius) for category, pos, radius in searches]
+
+    old_maps = dict(game.get_collision_maps())
+    results = search(old_maps)
+    before = {category: collision_map.get_candidates_per_query() for category, collision_map in old_maps.items()}
+    report = game.tune_collision_grids()
+    new_maps = game.get_collision_maps()
+    # Leaves out the tuner's trial queries, which hierarchical grids count in their levels
+    for collision_map in new_maps.values():
+        for counted in getattr(collision_map, "levels", [collision_map]):
+            counted.queries = counted.candidates = 0
+    if search(new_maps) != results:
+        raise AssertionError("The tuned grids gave different query results.")
+    after = {category: collision_map.get_candidates_per_query() for category, collision_map in new_maps.items()}
+    before_ms = after_ms = math.inf
+    for i in range(5):
+        before_ms = min(before_ms, time_call(search, old_maps) / len(searches))
+        after_ms = min(after_ms, time_call(search, new_maps) / len(searches))
+    
+    for category, stats in report["categories"].items():
+        trial = f", took {stats['time ratio']:.2f} of the time in the trial" if "time ratio" in stats else ""
+        print(f"tuning: {label}, {category}, cell sizes {stats['cell sizes']} ({'tuned' if stats['tuned'] else 'kept'}{trial}), candidates per query "
+            f"{before[category]:.2f} before and {after[category]:.2f} after (expected {stats['old candidates']:.2f} and "
+            f"{stats['candidates'] if stats['tuned'] else stats['old candidates']:.2f})")
+    print(f"tuning: {label}, {amount} colliders, {before_ms * 1000:.1f} us per query before and {after_ms * 1000:.1f} us after, "
+        f"tuning took {report['steps taken']} steps, {report['ms']:.1f} ms in all and {report['slowest step ms']:.1f} ms at most")
+
+def get_overlap(game):
+    """The deepest overlap in pixels between any two solid colliders."""
+
+    system = game.get_systems()["collider"]
+    first, second = system.find_candidate_pairs(system.solid_matrix)
+    first_x, first_y = system.get_positions(first)
+    second_x, second_y = system.get_positions(second)
+    overlap = system.columns.radius[first] + system.columns.radius[second] - np.hypot(second_x - first_x, second_y - first_y)
+    return max(overlap.max(initial=0), 0)
+
+def pushing(rows=20, columns=20, frames=300, dt=1 / 60):
+    """A tank drives into a block of squares packed so tightly that they start out overlapping, and
+    pushes its way through. Every frame of the collision pass is timed, to catch spikes."""
+
+    random.seed(rows * columns)
+    game = create_game(load_assets=True)
+    for row in range(rows):
+        for column in range(columns):
+            game.actions.SpawnShape(game.get_unique_id(), Vector2(column * 15, row * 15), random.uniform(0, 360), 1, 10, 0, False).execute_action(game)
+    tank_id = spawn_archetype(game, "player", 1)[0]
+    tank = game.get_component(tank_id, "transform")
+    tank.x, tank.y = -100, rows * 15 / 2
+    game.get_component(tank_id, "physics").target_velocity = Vector2(settings.PLAYER_MAX_SPEED, 0)
+
+    physics = game.get_systems()["physics"]
+    colliders = game.get_systems()["collider"]
+    frame_ms = []
+    overlaps = []
+    start_overlap = get_overlap(game)
+    for frame in range(frames):
+        physics.update(dt)
+        start = time.perf_counter()
+        colliders.update()
+        frame_ms.append((time.perf_counter() - start) * 1000)
+        game.action_handler.handle_actions()
+        overlaps.append(get_overlap(game))
+    
+    print(f"pushing: {rows * columns} squares, collision pass {sum(frame_ms) / frames:.2f} ms/frame, slowest frame {max(frame_ms):.2f} ms")
+    print(f"pushing: deepest overlap {start_overlap:.2f} px at the start, {overlaps[-1]:.2f} px at the end, {max(overlaps):.2f} px at worst, {sum(overlaps) / frames:.2f} px on average, tank moved {tank.x + 100:.0f} px")
+
+def sprites(amount=500, frames=120, dt=1 / 60):
+    """Spinning particles all drawn from the same image, drawn with the shared sprite cache and with
+    a cache too small to keep anything, which is like each one transforming its own image."""
+
+    for label, max_bytes in [("uncached", 0), ("cached", settings.SPRITE_CACHE_MAX_BYTES)]:
+        random.seed(amount)
+        game = create_game(load_assets=True)
+        game.sprite_cache = sprite_cache.SpriteCache(settings.SPRITE_CACHE_ANGLES, settings.SPRITE_CACHE_SCALE_STEP, max_bytes)
+        for id in spawn_archetype(game, "particle", amount):
+            transform = game.get_component(id, "transform")
+            transform.x, transform.y = random.uniform(0, game.camera.width), random.uniform(0, game.camera.height)
+            game.get_component(id, "physics").velocity = Vector2()
+        physics = game.get_systems()["physics"]
+        graphics = game.get_systems()["graphics"]
+        draw_ms = 0
+        for frame in range(frames):
+            physics.update(dt)
+            start = time.perf_counter()
+            graphics.update_and_draw()
+            draw_ms += (time.perf_counter() - start) * 1000
+        
+        stats = game.sprite_cache.get_stats()
+        print(f"sprites: {label}, {amount} particles, draw {draw_ms / frames:.2f} ms/frame, hit rate {stats['hit rate']:.0%}, {stats['surfaces']} surfaces, {stats['bytes'] / 1024:.0f} KB")
+
+def reference_draw_layer(game, components):
+    """The original drawing loop, one blit per image, which also rotated every image's offset. Only the
+    blitting is kept, since the images are already in the sprite cache."""
+
+    camera = game.camera
+    draw_calls = 0
+    for component in components:
+        if pygame.Rect(camera.corner, (camera.width, camera.height)).collidepoint(component.transform_component.x, component.transform_component.y):
+            for index, element in enumerate(component.images):
+                edits = component.image_edits[index]
+                if edits["image"] and edits["scale"] != 0:
+                    image, offset_vector, rotation_offset, scale_offset = element
+                    position = offset_vector + edits["position"]
+                    rotation = component.transform_component.rotation + edits["rotation"]
+                    width, height = component.last_used_images[index].get_size()
+                    offset_x, offset_y = position.rotate(rotation)
+                    game.screen.blit(component.last_used_images[index], (component.transform_component.x - width // 2 + offset_x - camera.corner.x, component.transform_component.y - height // 2 + offset_y - camera.corner.y))
+                    draw_calls += 1
+    return draw_calls
+
+def render(amounts=(500, 2000, 5000), frames=30):
+    """Sprites are spread over the screen, a fifth of them tanks and the rest particles, and timed one
+    layer at a time. The batched draw collects the layer and then draws it with one call, and the
+    per-image draw blits each image as it's collected. The original loop is timed too."""
+
+    for amount in amounts:
+        random.seed(amount)
+        game = create_game(load_assets=True)
+        spawn_archetype(game, "enemy", amount // 5)
+        spawn_archetype(game, "particle", amount - amount // 5)
+        for component in game.get_systems()["transform"].components[:game.get_systems()["transform"].live_count]:
+            component.x, component.y = random.uniform(0, game.camera.width), random.uniform(0, game.camera.height)
+        graphics = game.get_systems()["graphics"]
+        graphics.update_and_draw()
+        graphics.find_visible(game.camera)
+        for layer, components in enumerate(graphics.visible_layers):
+            if not components:
+                continue
+            # Taking turns, and keeping the fastest of each, so they're timed under the same conditions
+            batched_ms = per_image_ms = reference_ms = math.inf
+            for i in range(3):
+                batched_ms = min(batched_ms, time_call(lambda: graphics.submit_layer(game.screen, graphics.collect_layer(components)), repeat=frames))
+                per_image_ms = min(per_image_ms, time_call(graphics.collect_layer, components, game.screen.blit, repeat=frames))
+                reference_ms = min(reference_ms, time_call(reference_draw_layer, game, components, repeat=frames))
+            blits = len(graphics.collect_layer(components))
+            used = "batched" if layer in settings.BATCHED_GRAPHICS_LAYERS else "per-image"
+            print(f"render: {amount} sprites, layer {layer}, {blits} images, batched {batched_ms:.2f} ms, per-image {per_image_ms:.2f} ms, "
+                f"original {reference_ms:.2f} ms (drawn {used})")
+
+def reference_cull(game):
+    """The original check of each sprite's center against a new camera Rect."""
+
+    camera = game.camera
+    graphics = game.get_systems()["graphics"]
+    return [component for component in graphics.components[:graphics.live_count]
+        if pygame.Rect(camera.corner, (camera.width, camera.height)).collidepoint(component.transform_component.x, component.transform_component.y)]
+
+def culling(amounts=(2000, 10000, 40000), on_screen=500, repeat=30):
+    """The same number of particles are on screen however many there are, and the rest are spread around
+    the screen at the same density. Finding the visible set is timed against the original check, and
+    drawing and animating are timed using it."""
+
+    for amount in amounts:
+        random.seed(amount)
+        game = create_game(load_assets=True)
+        width, height = game.camera.width, game.camera.height
+        # A world as many screens big as it has screens full of particles, with the screen in the middle
+        side = math.sqrt(amount / on_screen)
+        for id in spawn_archetype(game, "particle", amount):
+            transform = game.get_component(id, "transform")
+            transform.x = random.uniform(-(side - 1) / 2, (side + 1) / 2) * width
+            transform.y = random.uniform(-(side - 1) / 2, (side + 1) / 2) * height
+        graphics = game.get_systems()["graphics"]
+        animator = game.get_systems()["animator"]
+        graphics.update_and_draw()
+
+        find_ms = time_call(graphics.find_visible, game.camera, repeat=repeat)
+        reference_ms = time_call(reference_cull, game, repeat=repeat)
+        draw_ms = time_call(graphics.update_and_draw, repeat=repeat)
+        animate_ms = time_call(animator.update, repeat=repeat)
+        graphics.find_visible(game.camera)
+        visible = len(graphics.visible_components)
+        centers = len(reference_cull(game))
+        print(f"culling: {amount} particles, {visible} visible ({centers} with their center on screen), visible set {find_ms:.2f} ms, per-sprite Rect check {reference_ms:.2f} ms, draw {draw_ms:.2f} ms, animate {animate_ms:.2f} ms")
+
+def reference_draw_grid(screen, corner, grid_size):
+    """The original background, filled and then drawn one grid line at a time. Gives how many draw calls it took."""
+
+    width, height = screen.get_size()
+    screen.fill(colors.white)
+    left_buffer = -corner.x % grid_size
+    for x in range(round(width // grid_size) + 1):
+        x_pos = left_buffer + x * grid_size
+        pygame.draw.line(screen, colors.light_gray, (x_pos, 0), (x_pos, height))
+    top_buffer = -corner.y % grid_size
+    for y in range(round(height // grid_size) + 1):
+        y_pos = top_buffer + y * grid_size
+        pygame.draw.line(screen, colors.light_gray, (0, y_pos), (width, y_pos))
+    return 1 + len(range(round(width // grid_size) + 1)) + len(range(round(height // grid_size) + 1))
+
+def ring_wall(center, radius, width, color=colors.black):
+    """A background feature like the ring wall the arena is meant to get."""
+
+    def draw(surface, rect):
+        # Only chunks the ring passes through have anything to draw
+        closest = pygame.Vector2(min(max(center[0], rect.left), rect.right), min(max(center[1], rect.top), rect.bottom))
+        farthest = max(pygame.Vector2(x, y).distance_to(center) for x in (rect.left, rect.right) for y in (rect.top, rect.bottom))
+        if closest.distance_to(center) > radius or farthest < radius - width:
+            return
+        pygame.draw.circle(surface, color, (center[0] - rect.left, center[1] - rect.top), radius, width)
+    return draw
+
+def backgrounds(sizes=((1280, 720), (2560, 1440), (3840, 2160)), grid_sizes=(100, 50, 20), frames=60):
+    """Draws the background with the camera moving a little each frame, one line at a time like the original,
+    with each line filled, and from the pre-rendered tile, and checks that they look the same. The default
+    grid size is 100. Then the camera circles an arena with a ring wall, drawn from chunks."""
+
+    for size in sizes:
+        for grid_size in grid_sizes:
+            screen = pygame.Surface(size)
+            reference_screen = pygame.Surface(size)
+            filled = background.Background(grid_size, tile_below=0)
+            tiled = background.Background(grid_size, tile_below=math.inf)
+            used = background.Background(grid_size)
+            corners = [Vector2(frame * 7.3 - 200, frame * -3.1 + 50) for frame in range(frames)]
+            # Taking turns, and keeping the fastest of each, so they're timed under the same conditions
+            filled_ms = tiled_ms = reference_ms = math.inf
+            for i in range(3):
+                filled_ms = min(filled_ms, time_call(lambda: [filled.draw(screen, corner) for corner in corners]) / frames)
+                tiled_ms = min(tiled_ms, time_call(lambda: [tiled.draw(screen, corner) for corner in corners]) / frames)
+                reference_ms = min(reference_ms, time_call(lambda: [reference_draw_grid(reference_screen, corner, grid_size) for corner in corners]) / frames)
+            draw_calls = reference_draw_grid(reference_screen, corners[-1], grid_size)
+            used.draw(screen, corners[0])
+            print(f"backgrounds: {size[0]}x{size[1]}, grid {grid_size}, filled lines {filled_ms:.2f} ms, tiled 1 blit {tiled_ms:.2f} ms, "
+                f"per-line {draw_calls} draw calls {reference_ms:.2f} ms (drawn {'tiled' if used.surface else 'filled'})")
+            for corner in [Vector2(0, 0), Vector2(-37, 1234), Vector2(999.5, -12.25)]:
+                reference_draw_grid(reference_screen, corner, grid_size)
+                for drawn in [filled, tiled]:
+                    drawn.draw(screen, corner)
+                    if pygame.image.tobytes(screen, "RGB") != pygame.image.tobytes(reference_screen, "RGB"):
+                        raise AssertionError(f"The background doesn't match the original at {corner}.")
+
+    screen = pygame.Surface(sizes[0])
+    arena = background.Background()
+    arena.add_feature(ring_wall((0, 0), 3000, 40))
+    corners = [Vector2(math.cos(angle) * 3000 - sizes[0][0] / 2, math.sin(angle) * 3000 - sizes[0][1] / 2)
+        for angle in [frame / (frames * 4) * 2 * math.pi for frame in range(frames * 4)]]
+    first_ms = time_call(lambda: [arena.draw(screen, corner) for corner in corners]) / len(corners)
+    rendered = arena.chunks_rendered
+    cached_ms = time_call(lambda: [arena.draw(screen, corner) for corner in corners]) / len(corners)
+    print(f"backgrounds: ring wall, first lap {first_ms:.2f} ms/frame ({rendered} chunks rendered), second lap {cached_ms:.2f} ms/frame ({arena.chunks_rendered - rendered} rendered), {len(arena.chunks)} chunks kept")
+
+benchmarks = {
+    "physics":physics,
+    "memory":memory,
+    "pools":pools,
+    "grid":grid,
+    "collisions":collisions,
+    "ccd":ccd,
+    "queries":queries,
+    "nearest":nearest,
+    "static":static,
+    "tuning":tuning,
+    "pushing":pushing,
+    "sprites":sprites,
+    "render":render,
+    "culling":culling,
+    "backgrounds":backgrounds
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(benchmarks)
+    for name in names:
+        benchmarks[name]()
@@ -20,16 +20,96 @@ Enemy_Controller: (TBD)
 Player_Controller: (move_keys: {'left':<key>, 'right':..., 'up':..., 'down':...}, transform_component)
 Barrel_Manager: (barrels: [[<last_shot>, <cooldown>, <image_index>], [etc.]], shooting, owner_string, graphics_component, transform_component)
 Life_Timer: (start_time, duration)
-Collider: (collision_id, radius, offset, collision_category, collidable_categories: ['actors', 'projectiles', 'shapes', 'particles], transform_component)
+Collider: (collision_id, radius, offset, collision_category: <one of settings.COLLISION_CATEGORIES>, particle_source_name, transform_component, fast=False)
 
 '''
 
+VECTOR_EPSILON = Vector2().epsilon
+
+
+class ColumnStore:
+    """Holds the data of a system's components in contiguous numpy arrays, one array per
+    field, indexed by the component's slot in the system."""
+
+    def __init__(self, columns):
+        # columns = {<name>: <dtype>}
+        self.dtypes = columns
+        self.size = 0
+        for name, dtype in columns.items():
+            setattr(self, name, np.zeros(0, dtype))
+    
+    def reserve(self, size):
+        """Makes sure the columns can hold at least `size` slots. They are at least doubled when
+        they need to grow, so growing a pool a little at a time doesn't copy them every time."""
+
+        if size > self.size:
+            self.grow(max(size, self.size * 2))
+    
+    def grow(self, size):
+        """Resizes every column to hold `size` slots while keeping the values already stored."""
+
+        for name, dtype in self.dtypes.items():
+            old_column = getattr(self, name)
+            column = np.zeros(size, dtype)
+            kept = min(size, len(old_column))
+            column[:kept] = old_column[:kept]
+            setattr(self, name, column)
+        self.size = size
+
+class ContactBuffer(ColumnStore):
+    """The contacts found by the last collision pass, in the order they are resolved. The same
+    arrays are reused every pass, and only grow when there are more contacts than ever before."""
+
+    def __init__(self):
+        super().__init__({
+            # The slots are only for the ColliderSystem, since they change when colliders move
+            "first_slot":np.int64,
+            "second_slot":np.int64,
+            "first_id":np.int64,
+            "second_id":np.int64,
+            "first_category":np.int64,
+            "second_category":np.int64,
+            # Where the circles touched, and how far through the frame's movement it was
+            "x":np.float64,
+            "y":np.float64,
+            "time":np.float64
+        })
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def set(self, **columns):
+        """Replaces the contacts. Takes an array for every column."""
+
+        self.count = len(columns["first_slot"])
+        self.reserve(self.count)
+        for name, values in columns.items():
+            getattr(self, name)[:self.count] = values
+    
+    def get(self, name):
+        return getattr(self, name)[:self.count]
+
+def column_property(name):
+    """Lets a component read and write its row of a column as if it were a normal attribute."""
+
+    def get(self):
+        return getattr(self.columns, name)[self.slot]
+
+    def set(self, value):
+        getattr(self.columns, name)[self.slot] = value
+
+    return property(get, set)
 
 class Component:
+    # Components are preallocated in bulk, so they use slots rather than a __dict__ to stay small
+    __slots__ = ("game", "slot", "id")
 
-    def __init__(self, game, next_available):
+    def __init__(self, game, slot):
         self.game = game
-        self.next_available = next_available
+        # The index of the component in its system. Live components are kept packed at the
+        # front of the system, so this changes whenever the component is moved.
+        self.slot = slot
         self.id = None
     
     def activate(self):
@@ -38,9 +118,16 @@ class Component:
         pass
 
 class Transform(Component):
+    __slots__ = ("columns",)
+    # The values are stored in the TransformSystem's columns. The component is only a view of its slot.
+    x = column_property("x")
+    y = column_property("y")
+    rotation = column_property("rotation")
+    scale = column_property("scale")
 
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
+        self.columns = None
     
     def activate(self, id, x, y, rotation, scale):
         self.id = id
@@ -50,9 +137,19 @@ class Transform(Component):
         self.scale = scale
 
 class Physics(Component):
+    __slots__ = ("columns", "transform_component")
+    # The values are stored in the PhysicsSystem's columns. The component is only a view of its slot.
+    max_speed = column_property("max_speed")
+    rotational_force = column_property("rotational_force")
+    accel = column_property("accel")
+    decel = column_property("decel")
+    friction = column_property("friction")
+    rotation_friction = column_property("rotation_friction")
+    transform_slot = column_property("transform_slot")
 
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
+        self.columns = None
     
     def activate(self, id, angle, speeds, rotational_force, accel, decel, friction, transform_component, rotation_friction=True):
         self.id = id
@@ -61,21 +158,53 @@ class Physics(Component):
         self.accel = accel
         self.decel = decel
         self.friction = friction
-        self.velocity = Vector2()
-        self.velocity.from_polar((current_speed, angle))
-        self.target_velocity = Vector2()
-        self.target_velocity.from_polar((target_speed, angle))
+        velocity = Vector2()
+        velocity.from_polar((current_speed, angle))
+        self.velocity = velocity
+        target_velocity = Vector2()
+        target_velocity.from_polar((target_speed, angle))
+        self.target_velocity = target_velocity
         self.transform_component = transform_component
+        self.transform_slot = transform_component.slot
         self.rotation_friction = rotation_friction
+    
+    @property
+    def velocity(self):
+        """Gives a copy of the velocity. Assign a new vector to change it."""
+
+        return Vector2(self.columns.vx[self.slot], self.columns.vy[self.slot])
+    
+    @velocity.setter
+    def velocity(self, velocity):
+        self.columns.vx[self.slot], self.columns.vy[self.slot] = velocity
+    
+    @property
+    def target_velocity(self):
+        """Gives a copy of the target velocity. Assign a new vector to change it."""
+
+        return Vector2(self.columns.target_vx[self.slot], self.columns.target_vy[self.slot])
+    
+    @target_velocity.setter
+    def target_velocity(self, target_velocity):
+        self.columns.target_vx[self.slot], self.columns.target_vy[self.slot] = target_velocity
 
 class Graphics(Component):
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    __slots__ = ("columns", "transform_component", "images", "image_edits", "last_rotation", "last_edits", "last_used_images", "previous_images", "last_offsets")
+    # Kept in the GraphicsSystem's columns so that everything on screen can be found at once
+    layer = column_property("layer")
+    transform_slot = column_property("transform_slot")
+    # How far from the entity's center its images reach
+    bounds = column_property("bounds")
+
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
+        self.columns = None
     
     def activate(self, id, layer, images, transform_component):
         self.id = id
         self.layer = layer
         self.transform_component = transform_component
+        self.transform_slot = transform_component.slot
         # images = [[<name>, <offset_position>, <rotation>, <scale_offset>], [etc.]]
         self.images = images
         self.image_edits = [{}] * len(images)
@@ -83,7 +212,17 @@ class Graphics(Component):
         self.last_edits = [{}] * len(images)
         self.last_used_images = [element[0] for element in self.images]
         self.previous_images = [element[0] for element in self.images]
+        # Where the top left of each last used image is from the entity's center, found along with the image
+        self.last_offsets = [(0, 0)] * len(images)
         self.reset_edits(list(range(len(images))))
+        self.bounds = 0
+        for image, offset_vector, rotation_offset, scale_offset in images:
+            self.bounds = max(self.bounds, self.get_bounds(image, offset_vector, transform_component.scale * scale_offset))
+    
+    def get_bounds(self, image, position, scale=1):
+        """How far from the entity's center the image can reach, whichever way it's turned."""
+
+        return position.length() + math.hypot(*image.get_size()) * scale / 2
     
     def switch_image_frame(self, index, new_image):
         if new_image == None:
@@ -97,8 +236,9 @@ class Graphics(Component):
             self.image_edits[index] = {"image":True,"position":Vector2(0, 0),"rotation":0,"scale":1}
 
 class Controller(Component):
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    __slots__ = ("controller_name", "controller_class")
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
     
     def activate(self, id, controller_name, *args):
         self.id = id
@@ -106,8 +246,9 @@ class Controller(Component):
         self.controller_class = self.game.controllers.name_dict[controller_name](self.game, self.id, *args)
 
 class BarrelManager(Component):
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    __slots__ = ("barrels", "shooting", "projectile_name", "graphics_component", "transform_component", "animator_component")
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
     
     def activate(self, id, barrels, shooting, projectile_name, graphics_component, transform_component, animator_component):
         self.id = id
@@ -121,8 +262,9 @@ class BarrelManager(Component):
         self.animator_component = animator_component
 
 class LifeTimer(Component):
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    __slots__ = ("start_time", "duration", "animator_component")
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
     
     def activate(self, id, start_time, duration, animator_component=None):
         self.id = id
@@ -131,10 +273,22 @@ class LifeTimer(Component):
         self.animator_component = animator_component
 
 class Collider(Component):
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    __slots__ = ("columns", "collision_id", "radius", "offset", "collision_category", "category", "particle_source_name", "transform_component", "collision_cells", "fast")
+    # Everything the collision pass needs is also copied into the ColliderSystem's columns, so that
+    # it can check every collider at once. Only these can change after the collider is added.
+    inactive = column_property("inactive")
+    transform_slot = column_property("transform_slot")
+    # Where the center of the collider was at the end of the last collision pass
+    previous_x = column_property("previous_x")
+    previous_y = column_property("previous_y")
+    # Colliders that stop moving fall asleep, and are left out of the sweep (see find_candidate_pairs)
+    asleep = column_property("asleep")
+
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
+        self.columns = None
     
-    def activate(self, id, collision_id, radius, offset, collision_category, collidable_categories, particle_source_name, transform_component):
+    def activate(self, id, collision_id, radius, offset, collision_category, particle_source_name, transform_component, fast=False):
         self.id = id
         self.collision_id = collision_id
         # This is the id of the actual parent entity this collider is connected
@@ -144,29 +298,53 @@ class Collider(Component):
         self.offset = offset
         self.collision_category = collision_category
         # The category that this collider component falls under.
-        # It can only have one.
-        self.collidable_categories = collidable_categories
-        # This is a list of all of the collision categories that this collider can collide
-        # with. Any colliders not under these categories will be ignored when checking collisions
+        # It can only have one. settings.COLLIDING_CATEGORIES decides what it collides with.
+        self.category = settings.COLLISION_CATEGORIES.index(collision_category)
+        # The category as an int, which is what the collision pass and handlers use
         self.particle_source_name = particle_source_name
         self.transform_component = transform_component
         self.collision_cells = set()
         self.inactive = False
+        self.transform_slot = transform_component.slot
+        self.fast = fast
+        # Fast colliders are checked along the whole path they moved each frame, so that they can't
+        # skip past something in one step.
+        self.previous_x = transform_component.x + offset.x
+        self.previous_y = transform_component.y + offset.y
+
+        columns = self.columns
+        slot = self.slot
+        columns.entity_id[slot] = id
+        columns.collision_id[slot] = collision_id
+        columns.radius[slot] = radius
+        columns.offset_x[slot] = offset.x
+        columns.offset_y[slot] = offset.y
+        columns.category[slot] = self.category
+        columns.fast[slot] = fast
+        columns.asleep[slot] = False
+        columns.still_frames[slot] = 0
 
 class HealthBar(Component):
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    __slots__ = ("columns", "width", "height", "offset", "transform_component")
+    # The entity's id slot is kept in a column so that the bars can look up health in bulk
+    entity_slot = column_property("entity_slot")
+
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
+        self.columns = None
     
     def activate(self, id, width, height, offset, transform_component):
         self.id = id
+        self.entity_slot = self.game.get_id_slot(id)
         self.width = width
         self.height = height
         self.offset = offset
         self.transform_component = transform_component
 
 class Animator(Component):
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    __slots__ = ("animation_set", "current_animations", "animation_states", "graphics_component", "transform_component", "current_frame", "start_time", "frame_start_time", "duration_multipliers", "images")
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
     
     def activate(self, id, animation_set, current_animations, graphics_component, transform_component):
         self.id = id
@@ -197,6 +375,8 @@ class Animator(Component):
             "played sound":False
         })
         self.duration_multipliers.append(duration_multiplier)
+        # It has to be started on time even if it's off screen
+        self.game.get_systems()["animator"].always_updated.add(self)
     
     def get_state_of_animation(self, animation):
         """Gives you the animation, current_frame, start_time, and frame_start_time of an animation"""
@@ -228,8 +408,9 @@ class Animator(Component):
             pass
 
 class UI(Component):
-    def __init__(self, game, next_available):
-        super().__init__(game, next_available)
+    __slots__ = ("element", "name", "checks_events")
+    def __init__(self, game, slot):
+        super().__init__(game, slot)
     
     def activate(self, id, ui_class):
         self.id = id
@@ -246,45 +427,115 @@ class System:
         self.component_name = component_name
         self.component_type = component_type
         self.components = []
-        self.first_available = None
-        self.farthest_component = 0
+        # Live components are always packed into components[:live_count]
+        self.live_count = 0
+        # The size that the pool is being grown to a little at a time
+        self.growth_target = 0
+        # How many frames in a row the pool has been less than settings.POOL_SHRINK_THRESHOLD full,
+        # and the most live components it had in that time
+        self.frames_below_shrink = 0
+        self.peak_below_shrink = 0
     
     def add_component(self, game, *args, **kwargs):
-        if self.first_available is None:
-            self.partition(game, max(len(self.components) + 1, 10)) # Partitions at least 10 empty spaces, but otherwise doubles the size
-        index = self.first_available
+        if self.live_count == len(self.components):
+            self.partition(game, max(len(self.components) + 1, 10), "full") # Partitions at least 10 empty spaces, but otherwise doubles the size
+        index = self.live_count
         self.components[index].activate(*args, **kwargs)
-        self.first_available = self.components[index].next_available
-        if index > self.farthest_component:
-            self.farthest_component = index
+        self.live_count += 1
         return index
     
     def remove_component(self, index):
-        try:
-            self.components[index].id = None
-            self.components[index].next_available = self.first_available
-            self.first_available = index
-            if index == self.farthest_component:
-                while index - 1 >=0 and self.components[index - 1].id is None:
-                    index -= 1
-                self.farthest_component = index
-        except:
+        """Deactivates the component and fills its slot with the last live component (swap and pop)
+        so that the live components stay packed at the front."""
+
+        if index >= self.live_count or self.components[index].id is None:
             raise Exception("Unable to remove component.")
+        
+        last = self.live_count - 1
+        if index != last:
+            self.move_component(last, index)
+        self.components[last].id = None
+        self.live_count -= 1
     
-    def partition(self, game, amount):
-        link = None
-        new_comps = []
-        insert = new_comps.insert
+    def move_component(self, source, destination):
+        """Moves the live component at `source` into the dead slot at `destination`, and the dead
+        one into `source`. The entity's index for this component is updated to match."""
+
+        components = self.components
+        moved = components[source]
+        components[source], components[destination] = components[destination], moved
+        components[source].slot = source
+        moved.slot = destination
+        game = moved.game
+        game.get_entities()[moved.id][game.get_component_index()[self.component_name]] = destination
+    
+    def partition(self, game, amount, reason="presize"):
+        """Adds `amount` inactive components to the end of the pool."""
+
+        start_time = time.perf_counter()
         length = len(self.components)
-        for i in range(amount):
-            comp = self.component_type(game, link)
-            insert(0, comp)
-            if link is None:
-                link = length + amount - 1
-            else:
-                link -= 1
-        self.first_available = length
-        self.components += new_comps
+        self.components.extend([self.component_type(game, slot) for slot in range(length, length + amount)])
+        game.instrumentation.record("pool growth", system=self.component_name, reason=reason, old_size=length,
+            new_size=length + amount, ms=(time.perf_counter() - start_time) * 1000)
+    
+    def maintain(self, game):
+        """Once the pool is more than settings.POOL_GROWTH_THRESHOLD full, it is doubled a few components
+        per call, so that it (hopefully) never has to grow all at once in the middle of a frame.
+        If it stays below settings.POOL_SHRINK_THRESHOLD full for settings.POOL_SHRINK_DELAY frames after
+        a spike, the empty end of it is dropped instead. Pools are only sorted when states switch."""
+
+        size = len(self.components)
+        if self.live_count > size * settings.POOL_GROWTH_THRESHOLD:
+            self.growth_target = max(self.growth_target, size * 2, 10)
+        if self.growth_target > size:
+            self.partition(game, min(self.growth_target - size, settings.POOL_GROWTH_STEP), "background")
+        elif self.live_count < size * settings.POOL_SHRINK_THRESHOLD:
+            self.frames_below_shrink += 1
+            self.peak_below_shrink = max(self.peak_below_shrink, self.live_count)
+            if self.frames_below_shrink >= settings.POOL_SHRINK_DELAY and self.get_compact_size() < size:
+                start_time = time.perf_counter()
+                self.shrink(game, self.get_compact_size())
+                game.instrumentation.record("pool shrink", system=self.component_name, live=self.live_count,
+                    old_size=size, new_size=len(self.components), ms=(time.perf_counter() - start_time) * 1000)
+        else:
+            self.frames_below_shrink = self.peak_below_shrink = 0
+    
+    def get_compact_size(self):
+        """The size a pool is shrunk to. It leaves room to double, and for the most components it had
+        while it was waiting to shrink without going over settings.POOL_GROWTH_THRESHOLD, so it doesn't
+        start growing again straight away. It never goes below its preset size."""
+
+        return max(self.live_count * 2, math.ceil(self.peak_below_shrink / settings.POOL_GROWTH_THRESHOLD),
+            settings.POOL_SIZES.get(self.component_name, 0), 10)
+    
+    def shrink(self, game, size):
+        """Drops the dead components off the end of the pool so that it's `size` (never less than the
+        live components). Nothing is moved, so it's cheap enough to do in the middle of a game."""
+
+        del self.components[max(size, self.live_count):]
+        self.growth_target = 0
+        self.frames_below_shrink = self.peak_below_shrink = 0
+    
+    def compact(self, game, size):
+        """Sorts the live components by their entity's id slot, so the components of an entity are at
+        about the same position in every system, and shrinks the pool to `size` (never less than the live
+        components). Components are moved rather than copied, so references to them stay valid.
+        Gives the old slot of each live component in its new order."""
+
+        live = self.components[:self.live_count]
+        live.sort(key=lambda component: game.get_id_slot(component.id))
+        order = [component.slot for component in live]
+        self.components = live + self.components[self.live_count:max(size, self.live_count)]
+        for slot, component in enumerate(self.components):
+            component.slot = slot
+
+        entities = game.get_entities()
+        component_index = game.get_component_index()[self.component_name]
+        for component in live:
+            entities[component.id][component_index] = component.slot
+        self.growth_target = 0
+        self.frames_below_shrink = self.peak_below_shrink = 0
+        return order
     
     def update(self):
         """Contains whatever code should be run for that component every loop"""
@@ -297,252 +548,793 @@ class DisplayedSystem(System):
     def update_and_draw(self):
         pass
 
-class TransformSystem(System):
+class ColumnSystem(System):
+    """A system whose components are views into a ColumnStore instead of holding
+    their own attributes. This lets the whole system be processed with array operations."""
+
+    def __init__(self, component_name, component_type, columns):
+        super().__init__(component_name, component_type)
+        self.columns = ColumnStore(columns)
+    
+    def move_component(self, source, destination):
+        super().move_component(source, destination)
+        columns = self.columns
+        for name in columns.dtypes:
+            column = getattr(columns, name)
+            column[destination] = column[source]
+    
+    def compact(self, game, size):
+        order = super().compact(game, size)
+        for name in self.columns.dtypes:
+            column = getattr(self.columns, name)
+            column[:len(order)] = column[order]
+        self.columns.grow(len(self.components))
+        return order
+    
+    def shrink(self, game, size):
+        super().shrink(game, size)
+        self.columns.grow(len(self.components))
+    
+    def partition(self, game, amount, reason="presize"):
+        length = len(self.components)
+        self.columns.reserve(length + amount)
+        super().partition(game, amount, reason)
+        for component in self.components[length:]:
+            component.columns = self.columns
+
+class TransformSystem(ColumnSystem):
     def __init__(self):
-        super().__init__("transform", Transform)
+        super().__init__("transform", Transform, {
+            "x":np.float64,
+            "y":np.float64,
+            "rotation":np.float64,
+            "scale":np.float64
+        })
+    
+    # These systems' components find their transform by its slot, so it needs to follow any moves
+    slot_followers = ("physics", "collider", "graphics")
 
-class PhysicsSystem(System):
+    def move_component(self, source, destination):
+        super().move_component(source, destination)
+        game = self.components[destination].game
+        id = self.components[destination].id
+        for name in self.slot_followers:
+            if game.has_component(id, name):
+                game.get_component(id, name).transform_slot = destination
+    
+    def compact(self, game, size):
+        order = super().compact(game, size)
+        for name in self.slot_followers:
+            system = game.get_systems()[name]
+            for component in system.components[:system.live_count]:
+                component.transform_slot = component.transform_component.slot
+        return order
+
+class PhysicsSystem(ColumnSystem):
     def __init__(self):
-        super().__init__("physics", Physics)
+        super().__init__("physics", Physics, {
+            "vx":np.float64,
+            "vy":np.float64,
+            "target_vx":np.float64,
+            "target_vy":np.float64,
+            "max_speed":np.float64,
+            "accel":np.float64,
+            "decel":np.float64,
+            "friction":np.float64,
+            "rotational_force":np.float64,
+            "rotation_friction":np.bool_,
+            "transform_slot":np.int64
+        })
+        self.transform_columns = None
+    
+    def add_component(self, game, *args, **kwargs):
+        index = super().add_component(game, *args, **kwargs)
+        self.transform_columns = self.components[index].transform_component.columns
+        return index
     
     def update(self, dt):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None:
-                if component.target_velocity == Vector2(0, 0):
-                    component.velocity = component.velocity.lerp(component.target_velocity, component.decel * component.friction)
-                else:
-                    component.velocity = component.velocity.lerp(component.target_velocity, component.accel - component.accel * component.friction)
+        """Integrates every active body at once with array operations. This gives the same
+        results as lerping each body's Vector2 one at a time, to within floating point
+        rounding (well under 1e-6 px per step)."""
+
+        columns = self.columns
+        live = self.live_count
+        if live == 0:
+            return
+
+        vx = columns.vx[:live]
+        vy = columns.vy[:live]
+        target_vx = columns.target_vx[:live]
+        target_vy = columns.target_vy[:live]
+        accel = columns.accel[:live]
+        friction = columns.friction[:live]
+        # Vector2 equality ignores differences smaller than its epsilon
+        stopping = (np.abs(target_vx) < VECTOR_EPSILON) & (np.abs(target_vy) < VECTOR_EPSILON)
+        t = np.where(stopping, columns.decel[:live] * friction, accel - accel * friction)
+        vx[:] = vx * (1 - t) + target_vx * t
+        vy[:] = vy * (1 - t) + target_vy * t
 
-                component.transform_component.x += component.velocity.x * dt
-                component.transform_component.y += component.velocity.y * dt
+        transforms = self.transform_columns
+        transform_slots = columns.transform_slot[:live]
+        rotational_force = columns.rotational_force[:live]
+        transforms.x[transform_slots] += vx * dt
+        transforms.y[transform_slots] += vy * dt
+        transforms.rotation[transform_slots] += rotational_force * 10 * dt
 
-                component.transform_component.rotation += component.rotational_force * 10 * dt
-                if component.rotation_friction and component.rotational_force:
-                    v = Vector2(1, 0) * component.rotational_force
-                    v = v.lerp(Vector2(), min(component.rotational_force * 0.05 * dt, 0.05))
-                    component.rotational_force = v.length()
+        spinning = columns.rotation_friction[:live] & (rotational_force != 0)
+        if spinning.any():
+            force = rotational_force[spinning]
+            t = np.minimum(force * 0.05 * dt, 0.05)
+            rotational_force[spinning] = np.abs(force * (1 - t))
 
-class GraphicsSystem(DisplayedSystem):
+class GraphicsSystem(ColumnSystem, DisplayedSystem):
     def __init__(self):
-        super().__init__("graphics", Graphics)
-        self.layer_indexes = []
+        super().__init__("graphics", Graphics, {
+            "layer":np.int64,
+            "transform_slot":np.int64,
+            "bounds":np.float64
+        })
+        self.transform_columns = None
         self.layers = 0
+        # The components on screen this frame, as a set and split into layers. Found once a frame by
+        # get_visible and shared with the AnimatorSystem, then thrown away after drawing. A frame
+        # that isn't drawn (ie while paused) doesn't throw them away, so they're also only kept for
+        # the game frame they were found in.
+        self.visible_components = None
+        self.visible_layers = None
+        self.visible_frame = None
+        # How many blits calls the last frame took
+        self.draw_calls = 0
     
     def check_layer_exists(self, layer):
         """Instead of hardcoding the number of graphics layers that I will use, I let it create a new
         layer whenever a higher one is needed. 0 is the bottom layer."""
 
-        while self.layers < layer + 1:
-            self.layer_indexes.append([])
-            self.layers += 1
+        self.layers = max(self.layers, layer + 1)
     
     def add_component(self, game, *args, **kwargs):
         layer = args[1]
         self.check_layer_exists(layer)
-        if self.first_available is None:
-            self.partition(game, max(len(self.components) + 1, 10))
-        index = self.first_available
-        self.components[index].activate(*args, **kwargs)
-        self.first_available = self.components[index].next_available
-        self.layer_indexes[layer].append(index)
-        if index > self.farthest_component:
-            self.farthest_component = index
+        index = super().add_component(game, *args, **kwargs)
+        self.transform_columns = self.components[index].transform_component.columns
         return index
     
-    def remove_component(self, index):
-        try:
-            self.components[index].id = None
-            self.components[index].next_available = self.first_available
-            self.layer_indexes[self.components[index].layer].remove(index)
-            self.first_available = index
-            if index == self.farthest_component:
-                while index - 1 >=0 and self.components[index - 1].id is None:
-                    index -= 1
-                self.farthest_component = index
-        except:
-            raise Exception("Unable to remove component.")
+    def find_visible(self, camera):
+        """Checks the bounds of every component against the camera's view at once, so sprites are drawn
+        as long as any part of them could be on screen. Each layer is in slot order."""
+
+        live = self.live_count
+        self.visible_frame = camera.game.frame
+        self.visible_layers = [[] for layer in range(self.layers)]
+        self.visible_components = set()
+        if live == 0:
+            return
+        
+        columns = self.columns
+        transform_slots = columns.transform_slot[:live]
+        x = self.transform_columns.x[transform_slots]
+        y = self.transform_columns.y[transform_slots]
+        bounds = columns.bounds[:live]
+        left, top = camera.corner
+        visible = ((x + bounds >= left) & (x - bounds <= left + camera.width)
+            & (y + bounds >= top) & (y - bounds <= top + camera.height))
+        components = self.components
+        layers = columns.layer[:live]
+        for layer in range(self.layers):
+            self.visible_layers[layer] = [components[slot] for slot in np.flatnonzero(visible & (layers == layer)).tolist()]
+            self.visible_components.update(self.visible_layers[layer])
+    
+    def get_visible(self, camera):
+        """The set of components on screen this frame. Only found the first time it's asked for each frame."""
+
+        if self.visible_components is None or self.visible_frame != camera.game.frame:
+            self.find_visible(camera)
+        return self.visible_components
     
     def update_and_draw(self):
-        for layer in self.layer_indexes:
-            for component_index in layer:
-                component = self.components[component_index]
-                if component.id is not None and Rect(component.game.camera.corner, (component.game.camera.width, component.game.camera.height)).collidepoint(component.transform_component.x, component.transform_component.y):
-                    for index, element in enumerate(component.images):
-                        edits = component.image_edits[index]
-                        if edits["image"] and edits["scale"] != 0:
-                            image, offset_vector, rotation_offset, scale_offset = element
-                            position = offset_vector + edits["position"]
-                            rotation = component.transform_component.rotation + edits["rotation"]
-                            scale = component.transform_component.scale * edits["scale"]
-                            if component.transform_component.rotation != component.last_rotation or component.last_edits[index] != edits or component.images[index][0] != component.previous_images[index]:
-                                ck = image.get_colorkey()
-                                width, height = image.get_size()
-                                image = pygame.transform.scale(image, (math.ceil(width * scale * scale_offset), math.ceil(height * scale * scale_offset)))
-                                image = pygame.transform.rotate(image, -rotation - rotation_offset)
-                                if ck:
-                                    image.set_colorkey(ck)
-                                component.last_used_images[index] = image
-                                component.previous_images[index] = component.images[index][0]
-                                component.last_edits[index] = edits.copy()
-                            width, height = component.last_used_images[index].get_size()
-                            camera = component.game.camera
-                            offset_x, offset_y = position.rotate(rotation)
-                            component.game.screen.blit(component.last_used_images[index], (component.transform_component.x - width // 2 + offset_x - camera.corner.x, component.transform_component.y - height // 2 + offset_y - camera.corner.y))
-                    component.last_rotation = component.transform_component.rotation
+        """Draws the layers bottom first. The layers in settings.BATCHED_GRAPHICS_LAYERS have their visible
+        images collected with where they go on screen, and are then drawn with one blits call. The rest are
+        blitted one image at a time as they're collected, which is faster for a few big images."""
+
+        self.draw_calls = 0
+        if self.live_count == 0:
+            return
+        game = self.components[0].game
+        screen = game.screen
+        self.get_visible(game.camera)
+        for layer, components in enumerate(self.visible_layers):
+            if layer in settings.BATCHED_GRAPHICS_LAYERS:
+                blits = self.collect_layer(components)
+                if blits:
+                    self.submit_layer(screen, blits)
+            else:
+                self.draw_calls += self.collect_layer(components, screen.blit)
+        # Things will have moved by the next frame
+        self.visible_components = self.visible_layers = None
+    
+    def collect_layer(self, components, blit=None):
+        """Gives [(<surface>, <screen position>), etc.] for every image of the components, which should
+        already be culled (see find_visible). If `blit` is given it's called with each of them instead,
+        and how many there were is given."""
+
+        blits = []
+        if not components:
+            return 0 if blit else blits
+        count = 0
+        camera = components[0].game.camera
+        corner_x, corner_y = camera.corner
+        sprite_cache = components[0].game.sprite_cache
+        for component in components:
+            transform = component.transform_component
+            x, y = float(transform.x) - corner_x, float(transform.y) - corner_y
+            rotation = float(transform.rotation)
+            changed = rotation != component.last_rotation
+            for index, edits in enumerate(component.image_edits):
+                if edits["image"] and edits["scale"] != 0:
+                    image = component.images[index][0]
+                    if changed or component.last_edits[index] != edits or image != component.previous_images[index]:
+                        image, offset_vector, rotation_offset, scale_offset = component.images[index]
+                        scale = transform.scale * edits["scale"]
+                        # Shared with everything else drawing the same image at about the same angle and scale
+                        surface = sprite_cache.get(image, -(rotation + edits["rotation"]) - rotation_offset, scale * scale_offset)
+                        component.last_used_images[index] = surface
+                        component.previous_images[index] = image
+                        component.last_edits[index] = edits.copy()
+                        position = offset_vector + edits["position"]
+                        # Animations can grow images or move them out, so the bounds only ever grow
+                        component.bounds = max(component.bounds, component.get_bounds(surface, position))
+                        width, height = surface.get_size()
+                        # Most images sit right on their entity, so there's nothing to rotate
+                        if position.x or position.y:
+                            offset_x, offset_y = position.rotate(rotation + edits["rotation"])
+                        else:
+                            offset_x = offset_y = 0
+                        component.last_offsets[index] = (offset_x - width // 2, offset_y - height // 2)
+                    offset_x, offset_y = component.last_offsets[index]
+                    if blit is None:
+                        blits.append((component.last_used_images[index], (x + offset_x, y + offset_y)))
+                    else:
+                        blit(component.last_used_images[index], (x + offset_x, y + offset_y))
+                        count += 1
+            component.last_rotation = rotation
+        return blits if blit is None else count
+    
+    def submit_layer(self, screen, blits):
+        # fblits is faster where it exists (pygame-ce), and doesn't build a list of the rects drawn
+        if hasattr(screen, "fblits"):
+            screen.fblits(blits)
+        else:
+            screen.blits(blits, doreturn=False)
+        self.draw_calls += 1
 
 class ControllerSystem(System):
     def __init__(self):
         super().__init__("controller", Controller)
 
     def update(self):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None:
-                component.controller_class.update()
+        for component in self.components[:self.live_count]:
+            component.controller_class.update()
     
     def get_action_from_event(self, event):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None:
-                action = component.controller_class.get_action(event)
-                if action is not None:
-                    component.game.add_action(action)
+        for component in self.components[:self.live_count]:
+            action = component.controller_class.get_action(event)
+            if action is not None:
+                component.game.add_action(action)
 
 class BarrelManagerSystem(System):
     def __init__(self):
         super().__init__("barrel manager", BarrelManager)
     
     def update(self):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None:
-                # update barrel animations?
-                if component.shooting:
-                    for barrel in component.barrels:
-                        last_shot, cooldown, image_index = barrel
-                        image, offset_vector, rotation_offset, scale_offset = component.graphics_component.images[image_index]
-                        scale = component.transform_component.scale * scale_offset
-                        if time.time() - last_shot >= cooldown:
-                            barrel[0] = time.time()
-                            barrel_length = settings.BARREL_LENGTH - 10 * scale
-                            barrel_angle = component.transform_component.rotation + rotation_offset
-                            barrel_end = Vector2()
-                            barrel_end.from_polar((barrel_length, barrel_angle))
-                            offset_x, offset_y = offset_vector.rotate(component.transform_component.rotation)
-                            firing_point = Vector2(component.transform_component.x + offset_x, component.transform_component.y + offset_y) + barrel_end
-                            id = component.game.get_unique_id() #                         id, spawn_point, rotation, scale, angle, speed, owner
-                            component.game.add_action(component.game.actions.SpawnBullet(id, component.id, firing_point, component.transform_component.rotation, scale, barrel_angle, settings.PLAYER_MAX_SPEED + 10, component.projectile_name))
-                            component.animator_component.play("shoot barrel", cooldown)
+        for component in self.components[:self.live_count]:
+            # update barrel animations?
+            if component.shooting:
+                for barrel in component.barrels:
+                    last_shot, cooldown, image_index = barrel
+                    image, offset_vector, rotation_offset, scale_offset = component.graphics_component.images[image_index]
+                    scale = component.transform_component.scale * scale_offset
+                    if time.time() - last_shot >= cooldown:
+                        barrel[0] = time.time()
+                        barrel_length = settings.BARREL_LENGTH - 10 * scale
+                        barrel_angle = component.transform_component.rotation + rotation_offset
+                        barrel_end = Vector2()
+                        barrel_end.from_polar((barrel_length, barrel_angle))
+                        offset_x, offset_y = offset_vector.rotate(component.transform_component.rotation)
+                        firing_point = Vector2(component.transform_component.x + offset_x, component.transform_component.y + offset_y) + barrel_end
+                        id = component.game.get_unique_id() #                         id, spawn_point, rotation, scale, angle, speed, owner
+                        component.game.add_action(component.game.actions.SpawnBullet(id, component.id, firing_point, component.transform_component.rotation, scale, barrel_angle, settings.PLAYER_MAX_SPEED + 10, component.projectile_name))
+                        component.animator_component.play("shoot barrel", cooldown)
 
 class LifeTimerSystem(System):
     def __init__(self):
         super().__init__("life timer", LifeTimer)
     
     def update(self):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None:
-                if time.time() - component.start_time >= component.duration:
-                    if component.animator_component != None:
-                        if "expired" not in component.animator_component.current_animations:
-                            component.animator_component.play("expired")
-                    else:
-                        component.game.add_action(component.game.actions.Destroy(component.id))
+        for component in self.components[:self.live_count]:
+            if time.time() - component.start_time >= component.duration:
+                if component.animator_component != None:
+                    if "expired" not in component.animator_component.current_animations:
+                        component.animator_component.play("expired")
+                else:
+                    component.game.add_action(component.game.actions.Destroy(component.id))
 
-class ColliderSystem(System):
+class ColliderSystem(ColumnSystem):
     def __init__(self):
-        super().__init__("collider", Collider)
+        super().__init__("collider", Collider, {
+            "entity_id":np.int64,
+            "collision_id":np.int64,
+            "radius":np.float64,
+            "offset_x":np.float64,
+            "offset_y":np.float64,
+            "category":np.int64,
+            "inactive":np.bool_,
+            "transform_slot":np.int64,
+            "fast":np.bool_,
+            "previous_x":np.float64,
+            "previous_y":np.float64,
+            "asleep":np.bool_,
+            # How many collision passes in a row the collider hasn't moved for
+            "still_frames":np.int64
+        })
+        self.transform_columns = None
+        self.contacts = ContactBuffer()
+        # The bounding boxes of the sleeping colliders sorted by their left edge, made again only when
+        # the sleepers change (see get_sleeper_boxes)
+        self.sleeper_boxes = None
+
+        # collision_matrix[a, b] is whether categories a and b collide, so filtering a pair is one lookup.
+        # handled_first[a, b] is whether a contact between them is handled as (a, b) rather than (b, a).
+        categories = settings.COLLISION_CATEGORIES
+        self.collision_matrix = np.zeros((len(categories), len(categories)), np.bool_)
+        self.handled_first = np.zeros((len(categories), len(categories)), np.bool_)
+        for a, b in settings.COLLIDING_CATEGORIES:
+            a, b = categories.index(a), categories.index(b)
+            self.collision_matrix[a, b] = self.collision_matrix[b, a] = True
+            self.handled_first[a, b] = True
+        # Categories that look for collisions themselves. The others (ie shapes) are only ever collided with.
+        self.source_categories = self.handled_first.any(axis=1)
+        # solid_matrix[a, b] is whether categories a and b push each other apart. Categories that aren't
+        # solid have an inverse mass of 0, and so are never moved by the solver.
+        self.solid_matrix = np.zeros((len(categories), len(categories)), np.bool_)
+        for a, b in settings.SOLID_CATEGORIES:
+            a, b = categories.index(a), categories.index(b)
+            self.solid_matrix[a, b] = self.solid_matrix[b, a] = True
+        self.inverse_masses = np.zeros(len(categories))
+        for category, mass in settings.SOLID_MASSES.items():
+            self.inverse_masses[categories.index(category)] = 1 / mass
     
     def add_component(self, game, *args, **kwargs):
         index = super().add_component(game, *args, **kwargs)
-        self.components[index].game.get_collision_maps()[self.components[index].collision_category].insert_collider(self.components[index])
+        component = self.components[index]
+        self.transform_columns = component.transform_component.columns
+        game.get_collision_maps()[component.collision_category].insert_collider(component)
         return index
     
     def remove_component(self, index):
-        try:
-            self.components[index].game.get_collision_maps()[self.components[index].collision_category].remove_collider(self.components[index])
-            self.components[index].id = None
-            self.components[index].next_available = self.first_available
-            self.first_available = index
-            if index == self.farthest_component:
-                while index - 1 >=0 and self.components[index - 1].id is None:
-                    index -= 1
-                self.farthest_component = index
-        except:
-            raise Exception("Unable to remove component.")
+        component = self.components[index]
+        component.game.get_collision_maps()[component.collision_category].remove_collider(component)
+        if component.asleep:
+            self.sleeper_boxes = None
+        super().remove_component(index)
+    
+    def move_component(self, source, destination):
+        super().move_component(source, destination)
+        # Flat grids and the sleeper boxes find their colliders by slot
+        moved = self.components[destination]
+        moved.game.get_collision_maps()[moved.collision_category].invalidate()
+        if moved.asleep:
+            self.sleeper_boxes = None
+    
+    def compact(self, game, size):
+        order = super().compact(game, size)
+        for collision_map in game.get_collision_maps().values():
+            collision_map.invalidate()
+        self.sleeper_boxes = None
+        return order
     
     def distance_between(self, a, b):
         return math.sqrt((b.x - a.x) * (b.x - a.x) + (b.y - a.y) * (b.y - a.y))
 
     def distance_between_squared(self, a, b):
         return (b.x - a.x) * (b.x - a.x) + (b.y - a.y) * (b.y - a.y)
+    
+    def get_positions(self, slots):
+        """The centers of the colliders in `slots`."""
+
+        columns = self.columns
+        transform_slots = columns.transform_slot[slots]
+        return (self.transform_columns.x[transform_slots] + columns.offset_x[slots],
+            self.transform_columns.y[transform_slots] + columns.offset_y[slots])
+    
+    def get_start_positions(self, slots, x, y):
+        """Where the colliders in `slots` started moving from this frame. Only fast colliders are
+        checked along their path, so the rest are treated as if they were already at `x`, `y`."""
+
+        columns = self.columns
+        fast = columns.fast[slots]
+        return np.where(fast, columns.previous_x[slots], x), np.where(fast, columns.previous_y[slots], y)
+    
+    def get_sleeper_boxes(self):
+        """Gives the slots of the sleeping colliders and their bounding boxes as (<slots>, <low x>, <high x>,
+        <low y>, <high y>), sorted by low x, and the widest box. Sleeping colliders don't move, so this is only
+        made again when a collider falls asleep, wakes up, or changes slot, or if one of them was moved
+        before it could be woken (ie by solve_overlaps)."""
+
+        columns = self.columns
+        if self.sleeper_boxes is not None:
+            slots, low_x, high_x, low_y, high_y, width, x, y = self.sleeper_boxes
+            now_x, now_y = self.get_positions(slots)
+            if np.array_equal(now_x, x) and np.array_equal(now_y, y):
+                return self.sleeper_boxes[:6]
+        
+        live = self.live_count
+        slots = np.flatnonzero(columns.asleep[:live])
+        x, y = self.get_positions(slots)
+        order = np.argsort(x - columns.radius[slots], kind="stable")
+        slots, x, y = slots[order], x[order], y[order]
+        radius = columns.radius[slots]
+        width = 2 * radius.max() if len(slots) else 0
+        self.sleeper_boxes = (slots, x - radius, x + radius, y - radius, y + radius, width, x, y)
+        return self.sleeper_boxes[:6]
+    
+    def find_candidate_pairs(self, matrix=None):
+        """Sort and sweep over every active collider that's awake at once. The bounding boxes are sorted by
+        their left edge along whichever axis the colliders are more spread out on, and each one is paired with
+        the ones after it that start before it ends. A fast collider's box covers its whole path this frame.
+        Sleeping colliders are left out of the sweep, since two of them can't have started touching. Instead
+        each awake box looks up the sleepers it overlaps in the sleeper boxes (see get_sleeper_boxes), which
+        are already sorted. Gives two arrays of slots, each pair only once, and only the pairs whose
+        categories are paired in `matrix` (the collision matrix by default)."""
+
+        if matrix is None:
+            matrix = self.collision_matrix
+        columns = self.columns
+        live = self.live_count
+        # Colliders in categories that collide with nothing are left out completely
+        active = np.flatnonzero(~columns.inactive[:live] & ~columns.asleep[:live] & matrix.any(axis=1)[columns.category[:live]])
+        if len(active) == 0:
+            return active, active
+        
+        x, y = self.get_positions(active)
+        start_x, start_y = self.get_start_positions(active, x, y)
+        radius = self.columns.radius[active]
+        low_x, high_x = np.minimum(x, start_x) - radius, np.maximum(x, start_x) + radius
+        low_y, high_y = np.minimum(y, start_y) - radius, np.maximum(y, start_y) + radius
+
+        # Awake against asleep. A sleeper overlaps a box on x if its left edge is between the box's left
+        # edge minus the widest sleeper and the box's right edge.
+        slots, sleeper_low_x, sleeper_high_x, sleeper_low_y, sleeper_high_y, width = self.get_sleeper_boxes()
+        starts = np.searchsorted(sleeper_low_x, low_x - width, side="left")
+        counts = np.searchsorted(sleeper_low_x, high_x, side="right") - starts
+        awake = np.repeat(np.arange(len(active)), counts)
+        asleep = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        overlapping = ((sleeper_high_x[asleep] >= low_x[awake]) & (sleeper_low_y[asleep] <= high_y[awake])
+            & (low_y[awake] <= sleeper_high_y[asleep]))
+        awake_first = active[awake[overlapping]]
+        asleep_second = slots[asleep[overlapping]]
+
+        # Awake against awake
+        if np.ptp(x) < np.ptp(y):
+            low_x, high_x, low_y, high_y = low_y, high_y, low_x, high_x
+        order = np.argsort(low_x, kind="stable")
+        low_x, high_x, low_y, high_y = low_x[order], high_x[order], low_y[order], high_y[order]
+        # Every box between i and ends[i] starts before box i ends
+        ends = np.searchsorted(low_x, high_x, side="right")
+        counts = ends - np.arange(len(order)) - 1
+        first = np.repeat(np.arange(len(order)), counts)
+        second = first + 1 + np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+        # They also have to overlap on the other axis
+        overlapping = (low_y[first] <= high_y[second]) & (low_y[second] <= high_y[first])
+
+        first = np.concatenate([active[order[first[overlapping]]], awake_first])
+        second = np.concatenate([active[order[second[overlapping]]], asleep_second])
+        # And be in categories that collide, and sleepers can have been deactivated since they fell asleep
+        colliding = matrix[columns.category[first], columns.category[second]] & ~columns.inactive[second]
+        first, second = first[colliding], second[colliding]
+        return np.minimum(first, second), np.maximum(first, second)
+    
+    def get_times_of_impact(self, start_x, start_y, motion_x, motion_y, radii):
+        """Sweeps circles that start `start` away from each other and move `motion` relative to each
+        other this frame. Gives how far through the motion (0 to 1) they first touch, or inf if they don't.
+        Circles that are already touching at the start give 0."""
+
+        a = motion_x ** 2 + motion_y ** 2
+        b = start_x * motion_x + start_y * motion_y
+        c = start_x ** 2 + start_y ** 2 - radii ** 2
+        discriminant = b * b - a * c
+        # Only circles that are getting closer can start touching
+        approaching = (a > 0) & (b < 0) & (discriminant >= 0)
+        time = np.full(len(a), np.inf)
+        time[approaching] = (-b[approaching] - np.sqrt(discriminant[approaching])) / a[approaching]
+        time[c < 0] = 0
+        time[time > 1] = np.inf
+        return time
+    
+    def find_contacts(self, first, second):
+        """Checks the circles of every candidate pair at once, sweeping them if one is fast. Each contact is
+        turned around if needed so that it is in the order its handler takes. Gives the slots of both colliders
+        and the time of impact of each contact, sorted by the first collider, then the time, then the second."""
+
+        columns = self.columns
+        first_x, first_y = self.get_positions(first)
+        second_x, second_y = self.get_positions(second)
+        first_start_x, first_start_y = self.get_start_positions(first, first_x, first_y)
+        second_start_x, second_start_y = self.get_start_positions(second, second_x, second_y)
+        time = self.get_times_of_impact(first_start_x - second_start_x, first_start_y - second_start_y,
+            (first_x - first_start_x) - (second_x - second_start_x), (first_y - first_start_y) - (second_y - second_start_y),
+            columns.radius[first] + columns.radius[second])
+        touching = (time <= 1) & (columns.collision_id[first] != columns.collision_id[second])
+        first, second, time = first[touching], second[touching], time[touching]
+
+        backwards = ~self.handled_first[columns.category[first], columns.category[second]]
+        first[backwards], second[backwards] = second[backwards], first[backwards]
+        order = np.lexsort((second, time, first))
+        return first[order], second[order], time[order]
+    
+    def fill_contacts(self, first, second, time):
+        """Puts the contacts into the contact buffer, sorted by time of impact and then by the ids of the
+        colliders' entities, so that they are resolved in the same order whatever slots the colliders are in."""
+
+        columns = self.columns
+        first_x, first_y = self.get_positions(first)
+        second_x, second_y = self.get_positions(second)
+        first_start_x, first_start_y = self.get_start_positions(first, first_x, first_y)
+        second_start_x, second_start_y = self.get_start_positions(second, second_x, second_y)
+        # Where the circles were when they touched, and the point between them on the first one's edge
+        first_x = first_start_x + (first_x - first_start_x) * time
+        first_y = first_start_y + (first_y - first_start_y) * time
+        second_x = second_start_x + (second_x - second_start_x) * time
+        second_y = second_start_y + (second_y - second_start_y) * time
+        share = columns.radius[first] / (columns.radius[first] + columns.radius[second])
+
+        first_id, second_id = columns.entity_id[first], columns.entity_id[second]
+        order = np.lexsort((second_id, first_id, time))
+        self.contacts.set(
+            first_slot=first[order],
+            second_slot=second[order],
+            first_id=first_id[order],
+            second_id=second_id[order],
+            first_category=columns.category[first][order],
+            second_category=columns.category[second][order],
+            x=(first_x + (second_x - first_x) * share)[order],
+            y=(first_y + (second_y - first_y) * share)[order],
+            time=time[order])
+    
+    def solve_overlaps(self, physics):
+        """Pushes overlapping solid colliders (ie tanks and shapes) apart and bounces them off each other.
+        The contacts are split into batches in which no body that can move is in two contacts, and the
+        batches are solved one after another with array operations, so each contact sees where the ones
+        before it moved its bodies to. That is done a few times over, since pushing one pair apart can
+        push one of them into something else. Each push is split between the two bodies by their masses,
+        and only pushes out part of the overlap, since in a tight pile pushing all of it out at once just
+        squeezes the next pair harder."""
+
+        first, second = self.find_candidate_pairs(self.solid_matrix)
+        if len(first) == 0:
+            return
+        columns = self.columns
+        transforms = self.transform_columns
+        physics_columns = physics.columns
+        # The bodies are numbered 0 to n here, so that they can be looked up in small arrays
+        bodies, pairs = np.unique(np.concatenate([first, second]), return_inverse=True)
+        a, b = pairs[:len(first)], pairs[len(first):]
+        transform_slots = columns.transform_slot[bodies]
+        physics_slots = np.full(len(transforms.x), -1)
+        physics_slots[physics_columns.transform_slot[:physics.live_count]] = np.arange(physics.live_count)
+        physics_slots = physics_slots[transform_slots]
+        # Bodies without physics can't be moved
+        inverse_masses = np.where(physics_slots >= 0, self.inverse_masses[columns.category[bodies]], 0)
+        total = inverse_masses[a] + inverse_masses[b]
+        movable = (total > 0) & (columns.collision_id[first] != columns.collision_id[second])
+        a, b, total = a[movable], b[movable], total[movable]
+        share_a = inverse_masses[a] / total
+        share_b = inverse_masses[b] / total
+        radii = columns.radius[first[movable]] + columns.radius[second[movable]]
+        start_x, start_y = self.get_positions(bodies)
+        # Pairs that are far enough apart can't be pushed into each other by the pairs around them
+        dx, dy = start_x[b] - start_x[a], start_y[b] - start_y[a]
+        close = dx * dx + dy * dy < (radii * settings.COLLISION_SOLVER_MARGIN) ** 2
+        a, b, radii, share_a, share_b = a[close], b[close], radii[close], share_a[close], share_b[close]
+        batches = [(a[batch], b[batch], radii[batch], share_a[batch], share_b[batch])
+            for batch in self.get_contact_batches(a, b, inverse_masses == 0)]
+
+        moving = physics_slots >= 0
+        # Each body's x, y, x velocity and y velocity, so that a contact's push and bounce are one update
+        bodies_state = np.column_stack([start_x, start_y,
+            np.where(moving, physics_columns.vx[physics_slots], 0), np.where(moving, physics_columns.vy[physics_slots], 0)])
+        correction = np.empty((len(a), 4))
+        restitution = settings.COLLISION_RESTITUTION
+        relaxation = settings.COLLISION_SOLVER_RELAXATION
+        for iteration in range(settings.COLLISION_SOLVER_ITERATIONS):
+            pushed = False
+            for batch_a, batch_b, batch_radii, batch_share_a, batch_share_b in batches:
+                state_a, state_b = bodies_state[batch_a], bodies_state[batch_b]
+                delta = state_b - state_a
+                distance = np.sqrt(delta[:, 0] ** 2 + delta[:, 1] ** 2)
+                touching = distance < batch_radii
+                if not touching.any():
+                    continue
+                pushed = True
+                push = np.where(touching, batch_radii - distance, 0) * relaxation
+                # Circles right on top of each other are pushed apart sideways
+                apart = distance > 0
+                normal = np.where(apart[:, None], delta[:, :2] / np.where(apart, distance, 1)[:, None], (1, 0))
+                # Only bodies moving towards each other along the normal bounce
+                closing = delta[:, 2] * normal[:, 0] + delta[:, 3] * normal[:, 1]
+                impulse = np.where(touching & (closing < 0), -(1 + restitution) * closing, 0)
+                batch_correction = correction[:len(batch_a)]
+                batch_correction[:, :2] = push[:, None] * normal
+                batch_correction[:, 2:] = impulse[:, None] * normal
+                bodies_state[batch_a] = state_a - batch_share_a[:, None] * batch_correction
+                bodies_state[batch_b] = state_b + batch_share_b[:, None] * batch_correction
+            if not pushed:
+                break
+
+        transforms.x[transform_slots] += bodies_state[:, 0] - start_x
+        transforms.y[transform_slots] += bodies_state[:, 1] - start_y
+        physics_columns.vx[physics_slots[moving]] = bodies_state[moving, 2]
+        physics_columns.vy[physics_slots[moving]] = bodies_state[moving, 3]
+
+    def get_contact_batches(self, a, b, fixed):
+        """Splits the contacts between bodies `a` and `b` into batches of contact indexes, in which no body
+        is in more than one contact unless it's `fixed` (ie can't be moved, so solving it twice at once is
+        harmless). Each round, every contact that comes first out of the ones left for both its bodies goes
+        into the batch, so the first one left always does. The contacts are taken in a scrambled order,
+        since in their own order neighbours come one after another and each round would only take a few."""
+
+        batches = []
+        # Multiplying by an odd number shuffles the indexes the same way every time
+        order = (np.arange(len(a), dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+        remaining = np.argsort(order)
+        first_contact = np.empty(len(fixed), dtype=remaining.dtype)
+        while len(remaining):
+            rank = np.arange(len(remaining))
+            first_contact.fill(len(remaining))
+            remaining_a, remaining_b = a[remaining], b[remaining]
+            np.minimum.at(first_contact, remaining_a, rank)
+            np.minimum.at(first_contact, remaining_b, rank)
+            chosen = (fixed[remaining_a] | (first_contact[remaining_a] == rank)) & (fixed[remaining_b] | (first_contact[remaining_b] == rank))
+            batches.append(remaining[chosen])
+            remaining = remaining[~chosen]
+        return batches
+
+    def move_to_impacts(self, impacts):
+        """Moves fast colliders back along their path to where they first hit something, so that whatever
+        happens because of the hit (ie particles) happens there. `impacts` is {<slot>: <time of impact>}."""
+
+        for slot, time in impacts.items():
+            component = self.components[slot]
+            transform = component.transform_component
+            start_x = component.previous_x - component.offset.x
+            start_y = component.previous_y - component.offset.y
+            transform.x = start_x + (transform.x - start_x) * time
+            transform.y = start_y + (transform.y - start_y) * time
+
+    def park(self, component):
+        component.game.get_collision_maps()[component.collision_category].park_collider(component)
+        component.asleep = True
+        self.sleeper_boxes = None
+    
+    def wake(self, component):
+        component.game.get_collision_maps()[component.collision_category].wake_collider(component)
+        component.asleep = False
+        self.columns.still_frames[component.slot] = 0
+        self.sleeper_boxes = None
+    
+    def update_sleep(self):
+        """Colliders that haven't moved more than settings.COLLIDER_SLEEP_EPSILON for settings.COLLIDER_SLEEP_FRAMES
+        collision passes fall asleep, so they're only checked against colliders that are awake. Sleeping colliders
+        that have been moved (ie pushed) wake up again. Fast colliders never sleep."""
+
+        columns = self.columns
+        live = self.live_count
+        x, y = self.get_positions(np.arange(live))
+        epsilon = settings.COLLIDER_SLEEP_EPSILON
+        moved = (np.abs(x - columns.previous_x[:live]) > epsilon) | (np.abs(y - columns.previous_y[:live]) > epsilon)
+        still_frames = columns.still_frames[:live]
+        still_frames[:] = np.where(moved, 0, still_frames + 1)
+
+        components = self.components
+        for slot in np.flatnonzero(columns.asleep[:live] & moved).tolist():
+            self.wake(components[slot])
+        tired = ~columns.asleep[:live] & ~columns.inactive[:live] & ~columns.fast[:live] & (still_frames >= settings.COLLIDER_SLEEP_FRAMES)
+        for slot in np.flatnonzero(tired).tolist():
+            self.park(components[slot])
 
     def update(self):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None and not component.inactive:
-                component.game.get_collision_maps()[component.collision_category].move_collider(component)
+        live = self.live_count
+        if live == 0:
+            return
         
-        # THIS IS A HORRID FUNCTION
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None and not component.inactive:
-                game = component.game
-                transform = component.transform_component
-                origin = Vector2(transform.x, transform.y) + component.offset
-                colliding_with_set = set().union(*[game.get_collision_maps()[c].contents.get(cell)
-                        for cell in component.collision_cells for c in component.collidable_categories
-                        if game.get_collision_maps()[c].contents.get(cell) != None])
-                # These for loops loop through the categories that the collider is colliding with
-                # and gets the cells of each, ignoring any that are empty (ie None).
-                # It combines the cell sets of all the dictionaries that are in the same cell as itself.
-                colliding_with_set -= {component}
-                # Removes itself from the set so it doesn't collide with itself.
-                for other_collider in colliding_with_set:
-                    other_transform = other_collider.transform_component
-                    other_origin = Vector2(other_transform.x, other_transform.y) + other_collider.offset
-                    if component.collision_id != other_collider.collision_id and not other_collider.inactive and self.distance_between_squared(origin, other_origin) < (component.radius + other_collider.radius) ** 2:
-                        game.helpers.handle_collision(component, other_collider) # Checks what the categories are of the colliding objects, and acts accordingly.
-
-class HealthBarSystem(DisplayedSystem):
+        # Solid colliders are pushed apart first, so that anything pushed far enough wakes up
+        self.solve_overlaps(self.components[0].game.get_systems()["physics"])
+        self.update_sleep()
+        components = self.components
+        columns = self.columns
+        awake = ~columns.inactive[:live] & ~columns.asleep[:live]
+        for category, collision_map in components[0].game.get_collision_maps().items():
+            collision_map.move_colliders(self, np.flatnonzero(awake & (columns.category[:live] == settings.COLLISION_CATEGORIES.index(category))))
+        
+        # The contacts are all found before any of them are resolved, so nothing changes while looking
+        self.fill_contacts(*self.find_contacts(*self.find_candidate_pairs()))
+        game = components[0].game
+        resolved = game.helpers.resolve_contacts(game, self.contacts)
+
+        contacts = self.contacts
+        fast = columns.fast
+        impacts = {}
+        for slots in [contacts.get("first_slot")[resolved], contacts.get("second_slot")[resolved]]:
+            for slot, time in zip(slots.tolist(), contacts.get("time")[resolved].tolist()):
+                # Being hit wakes a collider up
+                if components[slot].asleep:
+                    self.wake(components[slot])
+                if fast[slot]:
+                    impacts[slot] = min(impacts.get(slot, 1), time)
+        self.move_to_impacts(impacts)
+
+        columns.previous_x[:live], columns.previous_y[:live] = self.get_positions(np.arange(live))
+
+class HealthBarSystem(ColumnSystem, DisplayedSystem):
     def __init__(self):
-        super().__init__("health bar", HealthBar)
+        super().__init__("health bar", HealthBar, {
+            "entity_slot":np.int64
+        })
     
     def update_and_draw(self):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None:
-                game = component.game
-                transform = component.transform_component
-                rect = Rect(0, 0, component.width, component.height)
-                rect.center = (transform.x + component.offset.x - game.camera.corner.x,
-                    transform.y + component.offset.y - game.camera.corner.y)
-                health = game.get_property(component.id, "health")
-                max_health = game.get_property(component.id, "max health")
-                if health < max_health:
-                    p = health / max_health
-                    width = p * component.width
-                    pygame.draw.rect(game.screen, game.colors.black, rect, 0, 2)
-                    width = p * (component.width - 2)
-                    pygame.draw.rect(game.screen, game.colors.green, ((rect.topleft[0] + 1, rect.topleft[1] + 1), (width, component.height - 2)), 0, 2)
+        live = self.live_count
+        if live == 0:
+            return
+        
+        # Reads everyone's health at once so only the damaged bars get visited
+        game = self.components[0].game
+        entity_slots = self.columns.entity_slot[:live]
+        healths = game.get_entity_props().get_column("health")[entity_slots]
+        max_healths = game.get_entity_props().get_column("max health")[entity_slots]
+        for index in np.flatnonzero(healths < max_healths):
+            component = self.components[index]
+            transform = component.transform_component
+            rect = Rect(0, 0, component.width, component.height)
+            rect.center = (transform.x + component.offset.x - game.camera.corner.x,
+                transform.y + component.offset.y - game.camera.corner.y)
+            p = healths[index] / max_healths[index]
+            width = p * component.width
+            pygame.draw.rect(game.screen, game.colors.black, rect, 0, 2)
+            width = p * (component.width - 2)
+            pygame.draw.rect(game.screen, game.colors.green, ((rect.topleft[0] + 1, rect.topleft[1] + 1), (width, component.height - 2)), 0, 2)
 
 class AnimatorSystem(System):
     def __init__(self):
         super().__init__("animator", Animator)
+        # Animators that are updated even while they're off screen (see needs_update)
+        self.always_updated = set()
     
     def update(self):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
+        """Updates the animators on screen and the ones in always_updated, in slot order. Animations off
+        screen don't move between frames, and ones that don't do anything when they finish are only
+        finished once they come back on screen."""
+
+        if self.live_count == 0:
+            return
+        game = self.components[0].game
+        visible_components = game.get_systems()["graphics"].get_visible(game.camera)
+        entities = game.get_entities()
+        animator_index = game.get_component_index()["animator"]
+        updated = set(self.always_updated)
+        for graphics_component in visible_components:
+            slot = entities[graphics_component.id][animator_index]
+            if slot != -1:
+                updated.add(self.components[slot])
+        updated = sorted(updated, key=lambda component: component.slot)
+
+        for component in updated:
+            # It could have been destroyed since it was added to always_updated
             if component.id is not None and "done with animation" not in component.current_animations:
-                if Rect(component.game.camera.corner, (component.game.camera.width, component.game.camera.height)).collidepoint(component.transform_component.x, component.transform_component.y):
-                    visible = True
-                else:
-                    visible = False
-                
-                game = component.game
+                visible = component.graphics_component in visible_components
                 anim_set = component.animation_set
                 for current_animation, animation_state, animation_duration_multiplier in zip(component.current_animations, component.animation_states, component.duration_multipliers):
+                    # Finishing an animation can add this while the animations are being looped over
+                    if current_animation == "done with animation":
+                        break
                     animation_properties = game.animations[anim_set][current_animation]
                     duration = animation_properties["duration"] * animation_duration_multiplier
                     state = animation_state
@@ -584,6 +1376,22 @@ class AnimatorSystem(System):
                         if visible:
                             elapsed_percent = elapsed / frame_duration
                             self.iterate_frame(component, state, frame["properties"], elapsed_percent)
+        
+        self.always_updated.update(updated)
+        self.always_updated = {component for component in self.always_updated if self.needs_update(component)}
+    
+    def needs_update(self, component):
+        """Whether the animator has to be updated even while it's off screen, which is when it has an
+        animation that hasn't started yet, or one that does something when it finishes (ie destroys the
+        entity), since those have to happen on time."""
+
+        if component.id is None or "done with animation" in component.current_animations:
+            return False
+        animations = component.game.animations[component.animation_set]
+        for state in component.animation_states:
+            if state["start time"] is None or "on finish" in animations[state["animation"]]:
+                return True
+        return False
     
     def apply_frame(self, component, state, frame):
         graphics = component.graphics_component
@@ -687,24 +1495,21 @@ class UISystem(DisplayedSystem):
         super().__init__("ui", UI)
     
     def update_and_draw(self):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None:
-                if component.name in ["text", "button"]:
-                    if component.name == "text":
-                        text = component.element
-                    else:
-                        text = component.element.text
-                    if component.game.is_alive(text.reflect_prop[0]):
-                        prop = str(component.game.get_property(*text.reflect_prop))
-                        if text.text != prop:
-                            text.set_text(prop)
-                component.element.render(component.game.screen)
+        for component in self.components[:self.live_count]:
+            if component.name in ["text", "button"]:
+                if component.name == "text":
+                    text = component.element
+                else:
+                    text = component.element.text
+                if component.game.is_alive(text.reflect_prop[0]):
+                    prop = str(component.game.get_property(*text.reflect_prop))
+                    if text.text != prop:
+                        text.set_text(prop)
+            component.element.render(component.game.screen)
     
     def check_ui_elements_at_pos(self, event):
-        for i in range(min(self.farthest_component + 1, len(self.components))):
-            component = self.components[i]
-            if component.id is not None and component.checks_events:
+        for component in self.components[:self.live_count]:
+            if component.checks_events:
                 component.element.check_event(event)
 
 systems = [
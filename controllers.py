@@ -33,9 +33,10 @@ class PlayerController:
 
         # Setting the target velocity to key presses
         physics = self.game.get_component(self.id, "physics")
-        physics.target_velocity = Vector2(self.velx, self.vely)
+        target_velocity = Vector2(self.velx, self.vely)
         if (self.velx, self.vely) != (0, 0):
-            physics.target_velocity.scale_to_length(physics.max_speed)
+            target_velocity.scale_to_length(physics.max_speed)
+        physics.target_velocity = target_velocity
     
     def get_action(self, event):
         action = self.game.actions
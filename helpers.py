@@ -37,30 +37,73 @@ def spawn_particles(component, amount, source_string, spawn_point, rotation, sca
         game.add_action(game.actions.SpawnParticle(game.get_unique_id(),
             f"{particle}", *new_args))
 
-def handle_collision(component_a, component_b):
-    parent_b_id = component_b.collision_id
-    game = component_a.game
-    if component_a.collision_category == "projectiles":
-        if component_b.collision_category == "actors":
-            game.get_component(component_a.id, "animator").play("collided")
-            damage = game.get_property(component_a.id, "damage")
-            game.add_action(game.actions.Damage(parent_b_id, damage))
-            if game.get_property(component_b.id, "health") - damage <= 0:
-                game.set_property(component_b.id, "health", 0)
-                if game.camera.target_id == component_b.collision_id:
-                    game.add_action(game.actions.FocusCamera(component_a.collision_id))
-                
-                game.get_component(component_b.id, "animator").play("die")
-                game.add_action(game.actions.StopFiringBarrels(component_b.id))
-                component_b.inactive = True
-                
-        elif component_b.collision_category in ["projectiles", "shapes"]:
-            game.get_component(component_a.id, "animator").play("collided")
-    
-    elif component_a.collision_category == "actors":
-        if component_b.collision_category == "particles":
-            game.add_action(game.actions.Destroy(component_b.id))
-            game.set_property(component_a.id, "health", min(game.get_property(component_a.id, "health") + 2, 100))
+PROJECTILES, ACTORS, SHAPES, PARTICLES = (settings.COLLISION_CATEGORIES.index(category) for category in ["projectiles", "actors", "shapes", "particles"])
+
+def projectile_hit_actor(projectile, actor):
+    game = projectile.game
+    game.get_component(projectile.id, "animator").play("collided")
+    damage = game.get_property(projectile.id, "damage")
+    game.add_action(game.actions.Damage(actor.collision_id, damage))
+    if game.get_property(actor.id, "health") - damage <= 0:
+        game.set_property(actor.id, "health", 0)
+        if game.camera.target_id == actor.collision_id:
+            game.add_action(game.actions.FocusCamera(projectile.collision_id))
+        
+        game.get_component(actor.id, "animator").play("die")
+        game.add_action(game.actions.StopFiringBarrels(actor.id))
+        actor.inactive = True
+
+def projectile_hit_projectile(projectile_a, projectile_b):
+    projectile_a.game.get_component(projectile_a.id, "animator").play("collided")
+    projectile_b.game.get_component(projectile_b.id, "animator").play("collided")
+
+def projectile_hit_shape(projectile, shape):
+    projectile.game.get_component(projectile.id, "animator").play("collided")
+
+def actor_hit_particle(actor, particle):
+    game = actor.game
+    game.add_action(game.actions.Destroy(particle.id))
+    game.set_property(actor.id, "health", min(game.get_property(actor.id, "health") + 2, 100))
+
+# (<category a>, <category b>): handler(collider_a, collider_b)
+# There is one for each pair in settings.COLLIDING_CATEGORIES, in the same order.
+collision_handlers = {
+    (PROJECTILES, ACTORS):projectile_hit_actor,
+    (PROJECTILES, PROJECTILES):projectile_hit_projectile,
+    (PROJECTILES, SHAPES):projectile_hit_shape,
+    (ACTORS, PARTICLES):actor_hit_particle
+}
+
+# Colliders in these categories are used up by the first thing they hit each frame
+CONSUMED_CATEGORIES = {settings.COLLISION_CATEGORIES.index(category) for category in settings.COLLISION_CONSUMED_CATEGORIES}
+
+def resolve_contacts(game, contacts):
+    """Runs the collision handlers for the contacts in the ColliderSystem's contact buffer, in the
+    buffer's order. A contact is skipped if either collider was made inactive by an earlier one, or was
+    already used up by one (so a bullet touching two tanks only damages the first it reached).
+    Returns the indexes of the contacts that were handled."""
+
+    resolved = []
+    consumed = set()
+    # Handlers only queue actions, so no collider moves slot while the buffer is being resolved
+    components = game.get_systems()["collider"].components
+    columns = zip(contacts.get("first_slot").tolist(), contacts.get("second_slot").tolist(),
+        contacts.get("first_category").tolist(), contacts.get("second_category").tolist())
+    for index, (slot_a, slot_b, category_a, category_b) in enumerate(columns):
+        if slot_a in consumed or slot_b in consumed:
+            continue
+        collider_a = components[slot_a]
+        collider_b = components[slot_b]
+        if collider_a.inactive or collider_b.inactive:
+            continue
+
+        collision_handlers[(category_a, category_b)](collider_a, collider_b)
+        resolved.append(index)
+        if category_a in CONSUMED_CATEGORIES:
+            consumed.add(slot_a)
+        if category_b in CONSUMED_CATEGORIES:
+            consumed.add(slot_b)
+    return resolved
 
 def tank_death(component):
     collider = component.game.get_component(component.id, "collider")
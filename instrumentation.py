@@ -0,0 +1,30 @@
+import time
+from collections import deque
+
+class Instrumentation:
+    """Collects counters and a short history of events from the engine (pool growth, etc.) so they
+    can be looked at while the game runs or printed by the benchmarks."""
+
+    def __init__(self, max_events=256):
+        self.counters = {}
+        self.events = deque(maxlen=max_events)
+        self.listeners = []
+    
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def record(self, kind, **info):
+        """Stores an event and passes it to every listener. Each event is a dictionary with its
+        kind, the time it happened, and whatever info was given."""
+
+        event = {"kind":kind, "time":time.time(), **info}
+        self.events.append(event)
+        self.count(kind)
+        for listener in self.listeners:
+            listener(event)
+    
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+    
+    def get_events(self, kind):
+        return [event for event in self.events if event["kind"] == kind]
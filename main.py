@@ -1,22 +1,30 @@
 from pathlib import Path
 import pygame
 import time
+import gc
 import controllers
 import components
 import actions
 import colors
 import settings
 import spatial_hashing
+import sprite_cache
 import helpers
 import animations
+import background
 import ui
 import state_machine
+import instrumentation
+import numpy as np
 from pathlib import Path
 from pygame.locals import *
 from pygame.math import Vector2
 pygame.init()
 pygame.mixer.init()
 
+ENTITY_SLOT_MASK = (1 << settings.ENTITY_SLOT_BITS) - 1
+ENTITY_GENERATION_MASK = (1 << settings.ENTITY_GENERATION_BITS) - 1
+
 #TODO
 # Make healthbars shrink toward the middle and add a damage shrinking red bar behind if really bored.
 # Make the collectible particles green
@@ -89,17 +97,35 @@ class Container:
     def get_living_entities(self):
         return self.state_container.living_entities
     
-    def get_last_id(self):
-        return self.state_container.last_id
+    def get_id_generations(self):
+        return self.state_container.id_generations
+    
+    def get_live_ids(self):
+        return self.state_container.live_ids
+    
+    def get_free_id_slots(self):
+        return self.state_container.free_id_slots
+    
+    def get_unclaimed_ids(self):
+        return self.state_container.unclaimed_ids
     
     def get_collision_maps(self):
         return self.state_container.collision_maps
     
+    def get_signatures(self):
+        return self.state_container.signatures
+    
+    def get_component_bits(self):
+        return self.state_container.component_bits
+    
+    def get_queries(self):
+        return self.state_container.queries
+    
+    def get_component_queries(self):
+        return self.state_container.component_queries
+    
     def set_living_entities(self, living_entities):
         self.state_container.living_entities = living_entities
-    
-    def set_last_id(self, last_id):
-        self.state_container.last_id = last_id
 
 class Game(Container):
     def __init__(self, screen, collision_grid_width, scene_manager):
@@ -121,13 +147,22 @@ class Game(Container):
         #TODO Fix this action controller system at some point
         self.action_handler = actions.ActionHandler(self)
         self.camera = Camera(self)
-        self.grid_manager = spatial_hashing.GridManager
+        self.background = background.Background()
+        # Which broadphase the collision maps use. It can be swapped before a state is created.
+        self.grid_manager = spatial_hashing.grid_managers[settings.COLLISION_GRID_MANAGER]
+        self.instrumentation = instrumentation.Instrumentation()
+        self.sprite_cache = sprite_cache.SpriteCache(settings.SPRITE_CACHE_ANGLES, settings.SPRITE_CACHE_SCALE_STEP, settings.SPRITE_CACHE_MAX_BYTES)
+        self.frames_since_grid_tuning = 0
+        # The grid tuning that's under way, if there is one (see start_grid_tuning)
+        self.grid_tuning = None
 
         self.images = {}
         self.animation_images = {}
         self.sounds = {}
         self.dt = 0.01
         self.accumulator = 0.0
+        # Counts the frames the scene manager has run
+        self.frame = 0
 
         # This now holds all of the things that change from state to state
         # so when saving a state, this is what you save.
@@ -135,16 +170,55 @@ class Game(Container):
         super().__init__(state_container)
     
     def get_unique_id(self):
-        """Returns an int that's unique each time it's called"""
+        """Returns an int that no living or queued entity is using. The low bits are a slot that
+        gets recycled once its entity is destroyed, and the high bits are that slot's generation,
+        which changes on every reuse so old ids of the slot never match again."""
+
+        generations = self.get_id_generations()
+        free_id_slots = self.get_free_id_slots()
+        if free_id_slots:
+            slot = free_id_slots.pop()
+        else:
+            slot = len(generations)
+            if slot > ENTITY_SLOT_MASK:
+                raise RuntimeError(f"Ran out of entity ids. Only {ENTITY_SLOT_MASK + 1} can be in use at once.")
+            generations.append(0)
+            self.get_live_ids().append(None)
+        entity_id = generations[slot] << settings.ENTITY_SLOT_BITS | slot
+        self.get_unclaimed_ids().add(entity_id)
+        return entity_id
+    
+    def get_id_slot(self, entity_id):
+        """Gives the recycled slot part of an id, which is unique among the ids in use."""
+
+        return entity_id & ENTITY_SLOT_MASK
+    
+    def release_id(self, entity_id):
+        """Gives the id's slot back to be reused. This is done when destroying the entity, and
+        is only needed on its own for ids that were never used to create an entity."""
+
+        slot = entity_id & ENTITY_SLOT_MASK
+        generations = self.get_id_generations()
+        if generations[slot] != entity_id >> settings.ENTITY_SLOT_BITS:
+            return
+        self.get_unclaimed_ids().discard(entity_id)
+        self.get_live_ids()[slot] = None
+        generations[slot] = (generations[slot] + 1) & ENTITY_GENERATION_MASK
+        self.get_free_id_slots().append(slot)
+    
+    def release_unclaimed_ids(self, entity_ids):
+        """Releases the ids in `entity_ids` that still haven't been used to create an entity."""
 
-        last_id = self.get_last_id()
-        self.set_last_id(last_id + 1)
-        return last_id
+        unclaimed_ids = self.get_unclaimed_ids()
+        for entity_id in entity_ids & unclaimed_ids:
+            self.release_id(entity_id)
     
     def is_alive(self, entity_id):
         """Return whether the given entity exists in entities still"""
 
-        return entity_id in self.get_entities()
+        live_ids = self.get_live_ids()
+        slot = entity_id & ENTITY_SLOT_MASK
+        return slot < len(live_ids) and live_ids[slot] == entity_id
     
     def create_entity(self, entity_id):
         """Adds a new id to the list of entities without any components yet"""
@@ -153,8 +227,11 @@ class Game(Container):
         component_indexes = [-1] * len(self.get_system_index())
         # Each entity is just an id number connected to a list of component indexes
         self.get_entities()[entity_id] = component_indexes
+        self.get_signatures()[entity_id] = 0
+        self.get_live_ids()[entity_id & ENTITY_SLOT_MASK] = entity_id
+        self.get_unclaimed_ids().discard(entity_id)
         self.set_living_entities(self.get_living_entities() + 1)
-        self.get_entity_props()[entity_id] = {}
+        self.get_entity_props().add_entity(entity_id)
 
     def add_component(self, entity_id, component_name, *args, **kwargs):
         """Changes the value for the given component in that entity's list of
@@ -162,6 +239,9 @@ class Game(Container):
 
         index = self.get_systems()[component_name].add_component(self, entity_id, *args, **kwargs)
         self.get_entities()[entity_id][self.get_component_index()[component_name]] = index
+        self.get_signatures()[entity_id] |= self.get_component_bits()[component_name]
+        for query in self.get_component_queries().get(component_name, []):
+            query.add_if_matching(self, entity_id)
         return entity_id
     
     def add_property(self, entity_id, property, value):
@@ -174,42 +254,297 @@ class Game(Container):
         the list of entities."""
 
         try:
-            for i, index in enumerate(self.get_entities()[entity_id]):
-                if index != -1:
-                    self.get_system_index()[i].remove_component(index)
+            signature = self.get_signatures()[entity_id]
+            for query in self.get_queries().values():
+                if query.signature & signature == query.signature:
+                    query.discard(entity_id)
+            
+            # Only visit the systems whose bit is set, lowest first
+            component_indexes = self.get_entities()[entity_id]
+            remaining = signature
+            while remaining:
+                bit = remaining & -remaining
+                i = bit.bit_length() - 1
+                self.get_system_index()[i].remove_component(component_indexes[i])
+                remaining ^= bit
             self.get_entities().pop(entity_id)
-            self.get_entity_props().pop(entity_id)
+            self.get_signatures().pop(entity_id)
+            self.release_id(entity_id)
+            self.get_entity_props().remove_entity(entity_id)
             self.set_living_entities(self.get_living_entities() - 1)
         except:
             pass
     
+    def get_signature(self, *component_names):
+        """Gives the bitmask with the bit of each of the given components set."""
+
+        component_bits = self.get_component_bits()
+        signature = 0
+        for name in component_names:
+            signature |= component_bits[name]
+        return signature
+    
     def has_component(self, entity_id, component_name):
         """Checks if an entity has a component without raising an error."""
 
-        try:
-            component = self.get_component(entity_id, component_name)
-            return True
-        except KeyError:
-            return False
+        return self.get_signatures().get(entity_id, 0) & self.get_component_bits()[component_name] != 0
+    
+    def has_all(self, entity_id, *component_names):
+        """Checks if an entity has every one of the components."""
+
+        signature = self.get_signature(*component_names)
+        return self.get_signatures().get(entity_id, 0) & signature == signature
+    
+    def has_any(self, entity_id, *component_names):
+        """Checks if an entity has at least one of the components."""
+
+        return self.get_signatures().get(entity_id, 0) & self.get_signature(*component_names) != 0
+    
+    def filter_entities(self, *component_names, match_any=False):
+        """Gives the ids of every entity that has all of the components, or at least one of them
+        if `match_any` is True."""
+
+        signature = self.get_signature(*component_names)
+        if match_any:
+            return [entity_id for entity_id, entity_signature in self.get_signatures().items() if entity_signature & signature]
+        return [entity_id for entity_id, entity_signature in self.get_signatures().items() if entity_signature & signature == signature]
 
     def get_component(self, entity_id, component_name):
         """Gives a reference of a component of an entity."""
 
         try:
-            component = self.get_systems()[component_name].components[self.get_entities()[entity_id][self.get_component_index()[component_name]]]
-            return component
+            index = self.get_entities()[entity_id][self.get_component_index()[component_name]]
+            if index == -1:
+                raise KeyError
+            return self.get_systems()[component_name].components[index]
         except KeyError:
             raise KeyError(f"Component `{component_name}` or entity `{entity_id}` does not exist.")
     
+    def query(self, *component_names):
+        """Gives a list of (entity_id, <component>, <component>, etc.) for every entity that has all of
+        the given components, in the order they were asked for. The list is cached and kept up to date
+        as components are added and entities destroyed, so don't modify it. Loop over a copy if
+        entities could be destroyed during the loop."""
+
+        query = self.get_queries().get(component_names)
+        if query is None:
+            query = Query(component_names, self.get_signature(*component_names))
+            self.get_queries()[component_names] = query
+            for name in set(component_names):
+                self.get_component_queries().setdefault(name, []).append(query)
+            for entity_id in self.get_entities():
+                query.add_if_matching(self, entity_id)
+        return query.rows
+    
+    def query_radius(self, category, pos, radius):
+        """Gives the ids of the colliders in the collision category that overlap the circle, closest first."""
+
+        return self.get_collision_maps()[category].query_radius(pos, radius)
+    
+    def query_rect(self, category, rect):
+        """Gives the ids of the colliders in the collision category that overlap the rectangle,
+        closest to its center first."""
+
+        return self.get_collision_maps()[category].query_rect(rect)
+    
+    def raycast(self, category, origin, direction, max_distance):
+        """Gives the ids of the colliders in the collision category that the ray hits, in the order it hits them."""
+
+        return self.get_collision_maps()[category].raycast(origin, direction, max_distance)
+    
     def get_property(self, entity_id, property):
         """Gives a reference of a property of an entity."""
 
-        return self.get_entity_props()[entity_id][property]
+        return self.get_entity_props().get(entity_id, property)
     
     def set_property(self, entity_id, property, value):
         """Changes the value of an entity's property."""
 
-        self.get_entity_props()[entity_id][property] = value
+        self.get_entity_props().set(entity_id, property, value)
+    
+    def maintain_pools(self):
+        """Lets each system grow its pool in the background. Called once at the end of every frame.
+        New components are frozen out of the garbage collector straight away (see collect_garbage),
+        since otherwise a few frames of growth make it go over every object in the game at once."""
+
+        grew = False
+        for system in self.get_system_index():
+            size = len(system.components)
+            system.maintain(self)
+            grew = grew or len(system.components) > size
+        if grew:
+            self.collect_garbage(everything=False)
+    
+    def collect_garbage(self, everything=True):
+        """Collects all the garbage, and then freezes everything left so the garbage collector doesn't
+        look at it again. Components live for the whole state, so going over them only ever costs time,
+        and a full collection over every pool can take tens of milliseconds. Called when states switch,
+        which is a pause anyway.
+
+        Without `everything`, what's already frozen is left frozen, so only what was made since the last
+        freeze is collected before it's frozen too. That only goes over the new objects, so it's quick
+        enough to do mid-game, and no garbage is frozen along with them."""
+
+        start_time = time.perf_counter()
+        if everything:
+            gc.unfreeze()
+        collected = gc.collect()
+        gc.freeze()
+        ms = (time.perf_counter() - start_time) * 1000
+        self.instrumentation.record("garbage collection", collected=collected, everything=everything, ms=ms)
+    
+    def maintain_collision_grids(self):
+        """Re-tunes hierarchical collision grids settings.COLLISION_GRID_TUNE_INTERVAL frames after they were
+        last tuned. Tuning is done a step a frame (see get_grid_tuning_steps), so that no frame does much of
+        it. Called once at the end of every frame."""
+
+        if self.grid_manager is not spatial_hashing.HierarchicalGridManager or not settings.COLLISION_GRID_TUNE_INTERVAL:
+            return
+        if self.grid_tuning is not None:
+            self.step_grid_tuning()
+            return
+        self.frames_since_grid_tuning += 1
+        if self.frames_since_grid_tuning >= settings.COLLISION_GRID_TUNE_INTERVAL:
+            self.frames_since_grid_tuning = 0
+            self.start_grid_tuning(settings.COLLISION_CATEGORIES)
+    
+    def start_grid_tuning(self, categories):
+        """Starts tuning the grids of the categories, which step_grid_tuning then does a step at a time."""
+
+        self.grid_tuning = {"steps":None, "categories":{}, "steps taken":0, "ms":0, "slowest step ms":0}
+        self.grid_tuning["steps"] = self.get_grid_tuning_steps(categories, self.grid_tuning["categories"])
+    
+    def step_grid_tuning(self):
+        """Does the next step of tuning the grids. Once they're all done, the report of how it went is
+        recorded as a "grid tuning" event and given back."""
+
+        tuning = self.grid_tuning
+        start_time = time.perf_counter()
+        try:
+            next(tuning["steps"])
+            done = False
+        except StopIteration:
+            done = True
+        ms = (time.perf_counter() - start_time) * 1000
+        tuning["steps taken"] += 1
+        tuning["ms"] += ms
+        tuning["slowest step ms"] = max(tuning["slowest step ms"], ms)
+        if not done:
+            return None
+        
+        self.grid_tuning = None
+        del tuning["steps"]
+        self.instrumentation.record("grid tuning", **tuning)
+        return tuning
+    
+    def tune_collision_grids(self, categories=settings.COLLISION_CATEGORIES):
+        """Tunes the grids of the categories all at once, rather than a step a frame. Gives the report of
+        each category (see get_grid_tuning_steps), how many steps it took, and how long they took in all
+        and at most."""
+
+        self.start_grid_tuning(categories)
+        report = None
+        while report is None:
+            report = self.step_grid_tuning()
+        return report
+    
+    def get_grid_tuning_steps(self, categories, stats):
+        """Picks the cell sizes of each category's collision grid from its colliders (see spatial_hashing.GridTuner),
+        one layout estimate a step. If they changed, the old grid and a hierarchical grid with those sizes take turns
+        answering the same settings.COLLISION_GRID_TRIAL_QUERIES queries the size of a collider, once a step for
+        settings.COLLISION_GRID_TRIAL_FRAMES steps. The category is only moved to the new grid if, over the steps,
+        it took at most settings.COLLISION_GRID_TRIAL_MARGIN of the old grid's time (the median), so timing noise
+        doesn't swap grids back and forth. The grids only serve queries, since the collision pass doesn't use them.
+
+        Fills in `stats` with each category's sizes, the candidates per query that the tuner expects before and
+        after, the candidates per query its grid actually had so far, how long the new grid took compared to
+        the old one, and whether the new one is used."""
+
+        system = self.get_systems()["collider"]
+        tuner = spatial_hashing.GridTuner()
+        for category in categories:
+            index = settings.COLLISION_CATEGORIES.index(category)
+            members = np.flatnonzero(system.columns.category[:system.live_count] == index)
+            if not len(members):
+                continue
+            x, y = system.get_positions(members)
+            radii = system.columns.radius[members]
+            old_map = self.get_collision_maps()[category]
+            old_sizes = getattr(old_map, "cell_sizes", [old_map.cell_size])
+            for result in tuner.search(x, y, radii):
+                if result is None:
+                    yield
+            cell_sizes, candidates, cost = result
+            stats[category] = {
+                "cell sizes":old_sizes,
+                "candidates":candidates,
+                "old candidates":tuner.estimate(x, y, radii, old_sizes)[0],
+                "measured candidates":old_map.get_candidates_per_query(),
+                "tuned":False
+            }
+            yield
+            if cell_sizes == old_sizes:
+                continue
+
+            new_map = spatial_hashing.HierarchicalGridManager(self.collision_grid_width, cell_sizes)
+            new_map.attach(system, index)
+            ratios = []
+            for trial in range(settings.COLLISION_GRID_TRIAL_FRAMES):
+                # The state (and its grids) can change between steps
+                if self.get_collision_maps()[category] is not old_map:
+                    break
+                members = np.flatnonzero(system.columns.category[:system.live_count] == index)
+                if not len(members):
+                    break
+                # A different spread of colliders each time
+                slots = members[(np.arange(settings.COLLISION_GRID_TRIAL_QUERIES) * len(members) // settings.COLLISION_GRID_TRIAL_QUERIES + trial) % len(members)]
+                x, y = system.get_positions(slots)
+                queries = list(zip(zip(x.tolist(), y.tolist()), system.columns.radius[slots].tolist()))
+                # The new grid isn't told when its colliders move, so it's made again each time
+                new_map.invalidate()
+                # Which goes first swaps each time
+                if trial % 2:
+                    new_ms, old_ms = self.time_grid_queries([new_map, old_map], queries)
+                else:
+                    old_ms, new_ms = self.time_grid_queries([old_map, new_map], queries)
+                ratios.append(new_ms / old_ms)
+                yield
+            
+            if len(ratios) < settings.COLLISION_GRID_TRIAL_FRAMES:
+                continue
+            ratio = sorted(ratios)[len(ratios) // 2]
+            stats[category]["time ratio"] = ratio
+            if ratio <= settings.COLLISION_GRID_TRIAL_MARGIN:
+                stats[category].update({"cell sizes":cell_sizes, "tuned":True})
+                self.get_collision_maps()[category] = new_map
+    
+    def time_grid_queries(self, collision_maps, queries):
+        """How long each grid takes to answer each of the radius queries, in ms on average. The grids
+        are brought up to date first so that isn't counted."""
+
+        times = []
+        for collision_map in collision_maps:
+            collision_map.query_radius(*queries[0])
+        for collision_map in collision_maps:
+            start_time = time.perf_counter()
+            for query in queries:
+                collision_map.query_radius(*query)
+            times.append((time.perf_counter() - start_time) * 1000 / len(queries))
+        return times
+    
+    def compact(self):
+        """Sorts every pool's live components by entity and shrinks pools that grew during a spike.
+        Gives the stats of each system and how long it took."""
+
+        start_time = time.perf_counter()
+        stats = {}
+        for system in self.get_system_index():
+            old_size = len(system.components)
+            system.compact(self, min(old_size, system.get_compact_size()))
+            stats[system.component_name] = {"live":system.live_count, "old size":old_size, "new size":len(system.components)}
+        ms = (time.perf_counter() - start_time) * 1000
+        self.instrumentation.record("compaction", systems=stats, ms=ms)
+        return {"systems":stats, "ms":ms}
     
     def add_action(self, action):
         """Append an action onto the handler's queue to be executed next cycle."""
@@ -226,27 +561,127 @@ class Game(Container):
     
     def resync_components(self):
         time_since_save = time.time() - self.state_container.time_of_save
-        for barrel_manager in self.get_systems()["barrel manager"].components:
-            if barrel_manager.id is not None:
-                for barrel in barrel_manager.barrels:
-                    barrel[0] = barrel[0] + time_since_save
+        barrel_managers = self.get_systems()["barrel manager"]
+        for barrel_manager in barrel_managers.components[:barrel_managers.live_count]:
+            for barrel in barrel_manager.barrels:
+                barrel[0] = barrel[0] + time_since_save
         
-        for life_timer in self.get_systems()["life timer"].components:
-            if life_timer.id is not None:
-                life_timer.start_time += time_since_save
+        life_timers = self.get_systems()["life timer"]
+        for life_timer in life_timers.components[:life_timers.live_count]:
+            life_timer.start_time += time_since_save
         
-        for animator in self.get_systems()["animator"].components:
-            if animator.id is not None:
-                for animation in animator.animation_states:
-                    if animation["start time"] != None:
-                        animation["start time"] += time_since_save
-                    if animation["frame start time"] != None:
-                        animation["frame start time"] += time_since_save
+        animators = self.get_systems()["animator"]
+        for animator in animators.components[:animators.live_count]:
+            for animation in animator.animation_states:
+                if animation["start time"] != None:
+                    animation["start time"] += time_since_save
+                if animation["frame start time"] != None:
+                    animation["frame start time"] += time_since_save
         
-        for controller in self.get_systems()["controller"].components:
-            if controller.id is not None and controller.controller_name == "player":
+        controllers = self.get_systems()["controller"]
+        for controller in controllers.components[:controllers.live_count]:
+            if controller.controller_name == "player":
                 self.add_action(self.actions.StopFiringBarrels(controller.id))
 
+class PropertyStore:
+    """Holds entity properties. The ones declared in the schema (settings.ENTITY_PROPERTY_SCHEMA)
+    are kept in one numpy array per property indexed by the entity's id slot, so they can be read
+    in bulk. Any other property is kept in a dictionary for just the entities that have one."""
+
+    def __init__(self, schema):
+        # schema = {<property>: (<dtype>, <default>)}
+        self.schema = schema
+        self.size = 0
+        # The id living in each slot, or -1, so ids that are dead or reused are rejected
+        self.ids = np.zeros(0, np.int64)
+        self.columns = {}
+        # Whether each slot has been given a value for the property
+        self.present = {}
+        for property, (dtype, default) in schema.items():
+            self.columns[property] = np.zeros(0, dtype)
+            self.present[property] = np.zeros(0, np.bool_)
+        self.other_props = {}
+    
+    def grow(self, size):
+        def resize(array, fill):
+            new_array = np.full(size, fill, array.dtype)
+            new_array[:len(array)] = array
+            return new_array
+
+        self.ids = resize(self.ids, -1)
+        for property, (dtype, default) in self.schema.items():
+            self.columns[property] = resize(self.columns[property], default)
+            self.present[property] = resize(self.present[property], False)
+        self.size = size
+    
+    def add_entity(self, entity_id):
+        slot = entity_id & ENTITY_SLOT_MASK
+        if slot >= self.size:
+            self.grow(max(slot + 1, self.size * 2, 64))
+        self.ids[slot] = entity_id
+        for property, (dtype, default) in self.schema.items():
+            self.columns[property][slot] = default
+            self.present[property][slot] = False
+    
+    def remove_entity(self, entity_id):
+        slot = self.get_slot(entity_id)
+        self.ids[slot] = -1
+        self.other_props.pop(entity_id, None)
+    
+    def get_slot(self, entity_id):
+        slot = entity_id & ENTITY_SLOT_MASK
+        if slot >= self.size or self.ids[slot] != entity_id:
+            raise KeyError(f"Entity `{entity_id}` does not exist.")
+        return slot
+    
+    def get(self, entity_id, property):
+        slot = self.get_slot(entity_id)
+        if property in self.columns:
+            if not self.present[property][slot]:
+                raise KeyError(f"Entity `{entity_id}` does not have property `{property}`.")
+            return self.columns[property][slot].item()
+        return self.other_props[entity_id][property]
+    
+    def set(self, entity_id, property, value):
+        slot = self.get_slot(entity_id)
+        if property in self.columns:
+            self.columns[property][slot] = value
+            self.present[property][slot] = True
+        else:
+            self.other_props.setdefault(entity_id, {})[property] = value
+    
+    def get_column(self, property):
+        """Gives the whole array of a declared property. Slots without the property hold its default."""
+
+        return self.columns[property]
+
+class Query:
+    """Keeps the list of entities that have every one of a set of components. Entities are only
+    added or removed when their components change, so reading it every frame costs nothing."""
+
+    def __init__(self, component_names, signature):
+        self.component_names = component_names
+        self.signature = signature
+        self.rows = []
+        # Where each entity's row is in rows, so it can be removed by swapping with the last row
+        self.row_indexes = {}
+    
+    def add_if_matching(self, game, entity_id):
+        if entity_id in self.row_indexes or game.get_signatures()[entity_id] & self.signature != self.signature:
+            return
+        
+        self.row_indexes[entity_id] = len(self.rows)
+        self.rows.append((entity_id, *[game.get_component(entity_id, name) for name in self.component_names]))
+    
+    def discard(self, entity_id):
+        index = self.row_indexes.pop(entity_id, None)
+        if index is None:
+            return
+        last_row = self.rows.pop()
+        if index < len(self.rows):
+            self.rows[index] = last_row
+            self.row_indexes[last_row[0]] = index
+
 class Camera:
     def __init__(self, game, target_id=None):
         self.game = game
@@ -280,23 +715,6 @@ class Camera:
             self.velocity = self.velocity.lerp((Vector2(self.target.x, self.target.y) - center) * 4, 1)
 
             self.corner += self.velocity * self.game.dt
-    
-    def draw_grid(self):
-        """This function draw the background lines of the grid that move as the
-        player does."""
-
-        game = self.game
-        grid_box_w, grid_box_h = (settings.GRID_SIZE, settings.GRID_SIZE)
-
-        left_buffer = -self.corner.x % grid_box_w
-        for x in range(round(self.width // grid_box_w) + 1):
-            x_pos = left_buffer + x * grid_box_w
-            pygame.draw.line(game.screen, colors.light_gray, (x_pos, 0), (x_pos, self.height))
-
-        top_buffer = -self.corner.y % grid_box_h
-        for y in range(round(self.height // grid_box_h) + 1):
-            y_pos = top_buffer + y * grid_box_h
-            pygame.draw.line(game.screen, colors.light_gray, (0, y_pos), (self.width, y_pos))
 
 
 def create_game_instance(scene_manager):
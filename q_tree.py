@@ -1,312 +1,246 @@
-import sys
-import pygame
-import random
-import time
 import math
-from pygame.locals import *
-from pygame.math import Vector2
-pygame.init()
+import heapq
 
-tree_border = (1200, 750)
-screen_resolution = (1200, 750)
+class QuadTreeNode:
+    """A square of the tree. Leaves hold up to the tree's leaf size of points in flat lists,
+    and branches hold four children: top left, top right, bottom left, bottom right."""
 
-class Node:
-    def __init__(self, pos, id):
-        self.pos = pos
-        self.id = id
+    __slots__ = ("left", "top", "size", "parent", "children", "ids", "xs", "ys", "count")
 
-class N_Quad_Tree:
-    def __init__(self, top_left, bot_right, node=None, parent=None):
-        self.node = node
+    def __init__(self, left, top, size, parent=None):
+        self.left = left
+        self.top = top
+        self.size = size
         self.parent = parent
-        self.leaf = True
-        self.tl = top_left
-        self.br = bot_right
-        self.center = Vector2((self.tl.x + self.br.x) // 2, (self.tl.y + self.br.y) // 2)
-        self.empty_children()
-    
-    def empty_children(self):
-        self.children = {
-            "tlt":None,
-            "trt":None,
-            "blt":None,
-            "brt":None
-        }
-    
-    def get_dist(self, a, b):
-        return a.distance_to(b)
-    
-    def get_child(self, n):
-        x, y = self.center
-        child = ""
-        if n.pos.x <= x:
-            if n.pos.y <= y:
-                child = "tlt"
-            else:
-                child = "blt"
-        else:
-            if n.pos.y <= y:
-                child = "trt"
-            else:
-                child = "brt"
-        return child
-    
-    def contains_possible_close_nodes(self, n, closest):
-        x, y = n.pos
-        t, b = self.tl, self.br
-        tx, ty = t
-        bx, by = b
-        sides = []
-        if x <= tx: sides.append(abs(x - tx))
-        if x >= bx: sides.append(abs(x - bx))
-        if y <= ty: sides.append(abs(y - ty))
-        if y >= by: sides.append(abs(y - by))
-        if len(sides) > 1:
-            closest_side = min([n.pos.distance_to(t), n.pos.distance_to(b), n.pos.distance_to(Vector2(tx, by)), n.pos.distance_to(Vector2(bx, ty))])
-        else:
-            closest_side = min(sides)
-        return closest_side < closest[0]
-    
-    def check_close_ids(self, n, n_child, closest=None, draw_time=None):
-        # n_path is the child tree that holds n so it doesn't keep checking that tree
-        if self.leaf:
-            if draw_time:
-                screen.fill((255,255,255))
-                draw_search_node(self)
-                root.draw()
-                if closest:
-                    draw_line(n, closest[1])
-                    draw_green(closest[1])
-                draw_red(n)
-                pygame.display.update()
-                time.sleep(draw_time)
-            dist = self.get_dist(self.node.pos, n.pos)
-            if closest is None:
-                return (dist, self.node)
-            
-            if dist < closest[0]:
-                return (dist, self.node)
-            else:
-                return closest
-        else:
-            if draw_time:
-                screen.fill((255,255,255))
-                draw_search_node(self)
-                root.draw()
-                if closest:
-                    draw_line(n, closest[1])
-                    draw_green(closest[1])
-                draw_red(n)
-                pygame.display.update()
-                time.sleep(draw_time)
-            for c in self.children.values():
-                if c and c is not n_child:
-                    if closest is None:
-                        closest = c.check_close_ids(n, n_child, draw_time=draw_time)
-                    else:
-                        if c.contains_possible_close_nodes(n, closest):
-                            closest = c.check_close_ids(n, n_child, closest, draw_time=draw_time)
-            return closest
-    
-    def find_nearest_id(self, n, closest=None, draw_time=None):
-        """Closest takes in (dist, node)"""
-        if self.leaf:
-            if self.node and self.node.id == n.id:
-                if draw_time:
-                    screen.fill((255,255,255))
-                    root.draw()
-                    draw_red(self.node)
-                    pygame.display.update()
-                    time.sleep(draw_time)
-                return True, closest
-            else:
-                return False, closest
-        else:
-            child = self.get_child(n)
-            found, closest = self.children[child].find_nearest_id(n, draw_time=draw_time)
-            if not found:
-                return False, closest
-            else:
-                closest = self.check_close_ids(n, self.children[child], closest, draw_time=draw_time)
-                return True, closest
-    
-    def get_node_at_pos(self, pos):
-        if self.leaf:
-            return self
-        else:
-            child = ""
-            if pos.x <= self.center.x:
-                if pos.y <= self.center.y:
-                    child = "tlt"
-                else:
-                    child = "blt"
-            else:
-                if pos.y <= self.center.y:
-                    child = "trt"
-                else:
-                    child = "brt"
-            if self.children[child] is not None:
-                return self.children[child].get_node_at_pos(pos)
-            else:
-                return self
+        self.children = None
+        self.ids = []
+        self.xs = []
+        self.ys = []
+        # The number of points in this node and everything under it
+        self.count = 0
 
-    def remove(self, n):
-        if self.leaf:
-            if self.node.id == n.id:
-                self.node = None
-                return True
-            else:
-                return False
-        
-        elif not self.leaf:
-            child = self.get_child(n)
-            
-            total_children = sum([int(c is not None) for c in self.children.values()])
-            if self.children[child].remove(n) and total_children > 1:
-                self.children[child] = None
-                total_children -= 1
-            
-            if total_children == 1:
-                for c in self.children.values():
-                    if c and c.leaf:
-                        self.node = c.node
-                        self.leaf = True
-                        self.empty_children()
-                        return False
-            
-            return False
-    
-    def insert(self, n):
-        if self.node is None and self.leaf:  # Only occurs if it's the first insert
-            self.node = n
+    def contains(self, x, y):
+        return self.left <= x < self.left + self.size and self.top <= y < self.top + self.size
+
+    def get_quadrant(self, x, y):
+        half = self.size / 2
+        return (x >= self.left + half) + 2 * (y >= self.top + half)
+
+    def distance_squared_to(self, x, y):
+        """How far the point is from the closest part of the square."""
+        dx = max(self.left - x, 0, x - (self.left + self.size))
+        dy = max(self.top - y, 0, y - (self.top + self.size))
+        return dx * dx + dy * dy
+
+    def split(self):
+        half = self.size / 2
+        self.children = [QuadTreeNode(self.left + half * (quadrant % 2), self.top + half * (quadrant // 2), half, self)
+            for quadrant in range(4)]
+
+class QuadTree:
+    """A point index for finding the nearest entities to something, or the ones within a radius.
+    Each point is an id and a position. It can be built in bulk, and moving points are updated in place
+    when they stay in the same leaf. Points outside the tree make the tree grow to fit them.
+
+    Results are always ids sorted by distance, with ties broken by id."""
+
+    def __init__(self, left=0, top=0, size=1024, leaf_size=16, max_depth=20):
+        self.leaf_size = leaf_size
+        self.max_depth = max_depth
+        self.root = QuadTreeNode(left, top, size)
+        # id: (x, y) and id: the leaf the point is in
+        self.positions = {}
+        self.leaves = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, id):
+        return id in self.positions
+
+    def clear(self):
+        root = self.root
+        self.root = QuadTreeNode(root.left, root.top, root.size)
+        self.positions = {}
+        self.leaves = {}
+
+    def build(self, points):
+        """Replaces everything in the tree with the points, [(id, x, y), etc.]. The tree is fitted
+        around them and split from the top down, which is much faster than inserting them one by one."""
+
+        # Plain floats, since math on numpy scalars (ie from the transform columns) is much slower
+        points = [(id, float(x), float(y)) for id, x, y in points]
+        if not points:
+            self.clear()
             return
 
-        if self.leaf:
-            if self.node.pos.x <= self.center.x:
-                if self.node.pos.y <= self.center.y:
-                    self.children["tlt"] = N_Quad_Tree(Vector2(self.tl.x, self.tl.y), Vector2(self.center.x+1, self.center.y+1), self.node, self)
-                else:
-                    self.children["blt"] = N_Quad_Tree(Vector2(self.tl.x, self.center.y), Vector2(self.center.x+1, self.br.y), self.node, self)
-            else:
-                if self.node.pos.y <= self.center.y:
-                    self.children["trt"] = N_Quad_Tree(Vector2(self.center.x, self.tl.y), Vector2(self.br.x, self.center.y+1), self.node, self)
-                else:
-                    self.children["brt"] = N_Quad_Tree(Vector2(self.center.x, self.center.y), Vector2(self.br.x, self.br.y), self.node, self)
-            
-            self.node = None
-            self.leaf = False
-        
-        if abs(self.tl.x - self.br.x) > 2:
-            if n.pos.x <= self.center.x:
-                if n.pos.y <= self.center.y:
-                    child = "tlt"
-                    if self.children[child] == None:
-                        self.children[child] = N_Quad_Tree(Vector2(self.tl.x, self.tl.y), Vector2(self.center.x+1, self.center.y+1), n, self)
-                        return
-                    return self.children[child].insert(n)
-                else:
-                    child = "blt"
-                    if self.children[child] == None:
-                        self.children[child] = N_Quad_Tree(Vector2(self.tl.x, self.center.y), Vector2(self.center.x+1, self.br.y), n, self)
-                        return
-                    return self.children[child].insert(n)
-            else:
-                if n.pos.y <= self.center.y:
-                    child = "trt"
-                    if self.children[child] == None:
-                        self.children[child] = N_Quad_Tree(Vector2(self.center.x, self.tl.y), Vector2(self.br.x, self.center.y+1), n, self)
-                        return
-                    return self.children[child].insert(n)
-                else:
-                    child = "brt"
-                    if self.children[child] == None:
-                        self.children[child] = N_Quad_Tree(Vector2(self.center.x, self.center.y), Vector2(self.br.x, self.br.y), n, self)
-                        return
-                    return self.children[child].insert(n)
-        else:
+        left = min(x for id, x, y in points)
+        top = min(y for id, x, y in points)
+        size = max(max(x for id, x, y in points) - left, max(y for id, x, y in points) - top)
+        # A little bigger, so that the right and bottom edges are inside
+        self.root = QuadTreeNode(left, top, size * 1.001 + 1)
+        self.positions = {id:(x, y) for id, x, y in points}
+        self.leaves = {}
+        self.fill(self.root, points, 0)
+
+    def fill(self, node, points, depth):
+        node.count = len(points)
+        if len(points) <= self.leaf_size or depth >= self.max_depth:
+            node.ids = [id for id, x, y in points]
+            node.xs = [x for id, x, y in points]
+            node.ys = [y for id, x, y in points]
+            for id in node.ids:
+                self.leaves[id] = node
             return
-    
-    def draw(self):
-        if kind == "border" or True:
-            pygame.draw.rect(screen, (255, 0, 0), Rect(self.tl.x, self.tl.y, abs(self.tl.x - self.br.x), abs(self.tl.y - self.br.y)), 1)
-        if not self.leaf:
-            [self.children[child].draw() for child in ['tlt', 'trt', 'blt', 'brt'] if self.children[child]]
-        elif self.node != None and kind == "point":
-            pygame.draw.circle(screen, (0, 0, 255), (self.node.pos.x, self.node.pos.y), 2)
-
-def draw_red(n):
-    pygame.draw.circle(screen, (255, 0, 0), (n.pos.x, n.pos.y), 4)
-
-def draw_green(n):
-    pygame.draw.circle(screen, (0, 255, 0), (n.pos.x, n.pos.y), 4)
-
-def draw_search_node(tree):
-    pygame.draw.rect(screen, (245, 135, 135), (tree.tl, (tree.br.x - tree.tl.x, tree.br.y - tree.tl.y)))
-
-def draw_line(a, b):
-    pygame.draw.line(screen, (0, 0, 0), (a.pos.x, a.pos.y), (b.pos.x, b.pos.y))
-
-if __name__ == "__main__":
-    screen = pygame.display.set_mode(screen_resolution)
-    screen.fill((255, 255, 255))
-    root = N_Quad_Tree(Vector2(0, 0), Vector2(tree_border))
-    id_on = 0
-    kind = "point"
-    last_time = time.time()
-    nodes = []
-    last_closest = []
-
-    while 1:
-        for event in pygame.event.get():
-            if event.type == KEYDOWN and event.key == K_ESCAPE:
-                pygame.quit()
-                sys.exit()
-            elif event.type == KEYDOWN and event.key == K_RETURN:
-                if kind == "border":
-                    kind = "point"
-                else:
-                    kind = "border"
-            elif event.type == KEYDOWN and event.key == K_EQUALS:
-                for i in range(10):
-                    node = Node(Vector2(random.randint(0, tree_border[0]), random.randint(0, tree_border[1])), id_on)
-                    id_on += 1
-                    root.insert(node)
-                    nodes.append(node)
-            elif event.type == KEYDOWN and event.key == K_MINUS and len(nodes) > 0:
-                node = random.choice(nodes)
-                root.remove(node)
-                nodes.remove(node)
-                last_closest = []
-            elif event.type == MOUSEBUTTONDOWN:
-                node = root.get_node_at_pos(Vector2(pygame.mouse.get_pos()))
-                if node.node:
-                    exists, closest = root.find_nearest_id(node.node, draw_time=0.3)
-                    if exists and closest is not None:
-                        distance, closest_node = closest
-                        last_closest = [node, closest_node]
-                    else:
-                        print("Something went wrong")
-
-
-        screen.fill((255, 255, 255))
-        mouse_node = None
-        if len(nodes) > 1:
-            mouse_node = root.get_node_at_pos(Vector2(pygame.mouse.get_pos()))
-            if mouse_node.node is not None:
-                exists, closest = root.find_nearest_id(mouse_node.node)
-                if exists and closest is not None:
-                    distance, closest_node = closest
-                    draw_search_node(mouse_node)
-                    last_closest = [mouse_node.node, closest_node]
-                    draw_line(*last_closest)
-                else:
-                    print("Something went wrong again")
+
+        node.split()
+        quadrants = ([], [], [], [])
+        for point in points:
+            quadrants[node.get_quadrant(point[1], point[2])].append(point)
+        for child, quadrant in zip(node.children, quadrants):
+            self.fill(child, quadrant, depth + 1)
+
+    def grow_to(self, x, y):
+        """Doubles the tree towards the point until the point is inside it. The old root becomes one
+        of the new root's children."""
+
+        while not self.root.contains(x, y):
+            old = self.root
+            left = old.left - old.size if x < old.left else old.left
+            top = old.top - old.size if y < old.top else old.top
+            root = QuadTreeNode(left, top, old.size * 2)
+            root.split()
+            quadrant = root.get_quadrant(old.left, old.top)
+            root.children[quadrant] = old
+            old.parent = root
+            root.count = old.count
+            self.root = root
+
+    def insert(self, id, pos):
+        x, y = float(pos[0]), float(pos[1])
+        if id in self.positions:
+            self.remove(id)
+        if not self.root.contains(x, y):
+            self.grow_to(x, y)
+
+        node = self.root
+        depth = 0
+        while True:
+            node.count += 1
+            if node.children is None:
+                break
+            node = node.children[node.get_quadrant(x, y)]
+            depth += 1
+
+        node.ids.append(id)
+        node.xs.append(x)
+        node.ys.append(y)
+        self.positions[id] = (x, y)
+        self.leaves[id] = node
+        if len(node.ids) > self.leaf_size and depth < self.max_depth:
+            points = list(zip(node.ids, node.xs, node.ys))
+            node.ids, node.xs, node.ys = [], [], []
+            self.fill(node, points, depth)
+
+    def remove(self, id):
+        """Takes the point out, and joins leaves back together once their parent would fit in one."""
+
+        node = self.leaves.pop(id)
+        del self.positions[id]
+        index = node.ids.index(id)
+        for values in (node.ids, node.xs, node.ys):
+            values[index] = values[-1]
+            values.pop()
+
+        while node is not None:
+            node.count -= 1
+            if node.children is not None and node.count <= self.leaf_size:
+                self.merge(node)
+            node = node.parent
+
+    def merge(self, node):
+        ids, xs, ys = [], [], []
+        stack = list(node.children)
+        while stack:
+            child = stack.pop()
+            if child.children is not None:
+                stack.extend(child.children)
             else:
-                last_closest = []
-
-        root.draw()
-        if last_closest != []:
-            n1, n2 = last_closest
-            draw_red(n1)
-            draw_green(n2)
-        pygame.display.update()
\ No newline at end of file
+                ids += child.ids
+                xs += child.xs
+                ys += child.ys
+        node.children = None
+        node.ids, node.xs, node.ys = ids, xs, ys
+        for id in ids:
+            self.leaves[id] = node
+
+    def move(self, id, pos):
+        """Updates a point that moved. If it's still inside its leaf, it is just changed in place."""
+
+        x, y = float(pos[0]), float(pos[1])
+        node = self.leaves[id]
+        if node.contains(x, y):
+            index = node.ids.index(id)
+            node.xs[index] = x
+            node.ys[index] = y
+            self.positions[id] = (x, y)
+        else:
+            self.remove(id)
+            self.insert(id, (x, y))
+
+    def nearest(self, pos, k=1, max_distance=math.inf, exclude=()):
+        """The `k` closest ids to pos, within max_distance. Nodes are searched closest first, so most
+        of the tree is never looked at."""
+
+        x, y = pos
+        max_squared = max_distance * max_distance
+        # The k best so far, as a max heap of (-distance squared, -id)
+        best = []
+        nodes = [(self.root.distance_squared_to(x, y), 0, self.root)]
+        order = 1
+        while nodes:
+            node_distance, _, node = heapq.heappop(nodes)
+            if node_distance > max_squared or (len(best) == k and node_distance > -best[0][0]):
+                break
+            if node.children is not None:
+                for child in node.children:
+                    if child.count:
+                        heapq.heappush(nodes, (child.distance_squared_to(x, y), order, child))
+                        order += 1
+                continue
+
+            for id, point_x, point_y in zip(node.ids, node.xs, node.ys):
+                distance = (point_x - x) ** 2 + (point_y - y) ** 2
+                if distance > max_squared or id in exclude:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, -id))
+                elif (-distance, -id) > best[0]:
+                    heapq.heapreplace(best, (-distance, -id))
+        return [-id for distance, id in sorted(best, reverse=True)]
+
+    def find_nearest_id(self, id, k=1):
+        """The closest ids to one that is already in the tree, not counting itself."""
+
+        return self.nearest(self.positions[id], k, exclude=(id,))
+
+    def query_radius(self, pos, radius):
+        """Every id within the radius of pos."""
+
+        x, y = pos
+        radius_squared = radius * radius
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if not node.count or node.distance_squared_to(x, y) > radius_squared:
+                continue
+            if node.children is not None:
+                stack.extend(node.children)
+                continue
+            for id, point_x, point_y in zip(node.ids, node.xs, node.ys):
+                distance = (point_x - x) ** 2 + (point_y - y) ** 2
+                if distance <= radius_squared:
+                    found.append((distance, id))
+        found.sort()
+        return [id for distance, id in found]
@@ -53,6 +53,33 @@ PARTICLES = {
 # }
 
 COLLISION_CATEGORIES = ["projectiles", "actors", "shapes", "particles"]
+# The pairs of categories that collide. It goes both ways, but the first category of each pair is the one
+# whose colliders look for the collision and get handed to its handler first.
+COLLIDING_CATEGORIES = [("projectiles", "actors"), ("projectiles", "projectiles"), ("projectiles", "shapes"), ("actors", "particles")]
+COLLISION_CONSUMED_CATEGORIES = ["projectiles", "particles"] # These only resolve the first contact they make each frame
+# The pairs of categories that can't overlap and are pushed apart instead, and how heavy each of those categories is
+SOLID_CATEGORIES = [("actors", "actors"), ("actors", "shapes"), ("shapes", "shapes")]
+SOLID_MASSES = {"actors": 10, "shapes": 1}
+COLLISION_SOLVER_ITERATIONS = 3 # How many times over all the overlaps are solved each step
+COLLISION_RESTITUTION = 0.2 # How bouncy solid collisions are, from 0 (not at all) to 1
+COLLISION_SOLVER_MARGIN = 1.05 # Solid pairs further apart than this times their radii are left out of the solver
+COLLISION_SOLVER_RELAXATION = 0.7 # How much of an overlap each pass of the solver pushes out
+
+# Entity ids are <generation><slot>. This allows 2^20 entities at once, and a slot can be reused
+# 2^32 times before an old id of it could be mistaken for a living one.
+ENTITY_SLOT_BITS = 20
+ENTITY_GENERATION_BITS = 32
+
+# Entity properties that are stored in arrays so they can be read in bulk.
+# <property>: (<dtype>, <default>)
+# Any property not listed here is still allowed, but is stored per entity in a dictionary.
+# They are all whole numbers, so they're kept as ints and read back as ints.
+ENTITY_PROPERTY_SCHEMA = {
+    "health": ("int64", 0),
+    "max health": ("int64", 0),
+    "damage": ("int64", 0),
+    "xp": ("int64", 0)
+}
 
 # Settings
 PLAYER_MAX_SPEED = 300
@@ -71,5 +98,36 @@ PARTICLE_FRICTION = 0.1
 BARREL_LENGTH = 42
 BARREL_WIDTH = 21
 
+SPRITE_CACHE_ANGLES = 360 # How many angles around the circle rotated images are cached at
+SPRITE_CACHE_SCALE_STEP = 0.05 # Scaled images are cached at multiples of this
+SPRITE_CACHE_MAX_BYTES = 64 * 1024 * 1024 # The least recently used images are dropped past this
+BATCHED_GRAPHICS_LAYERS = (0,) # Layers drawn with one blits call (ie lots of small particles). The others, with fewer bigger images, are blitted an image at a time.
+
 GRID_SIZE = 100
-COLLISION_GRID_WIDTH = 80
\ No newline at end of file
+BACKGROUND_CHUNK_SIZE = 256 # The size of the pieces of the world that background features (ie arena walls) are drawn into
+BACKGROUND_MAX_CHUNKS = 256 # The least recently seen background chunks with something in them are dropped past this
+BACKGROUND_TILE_BELOW = 64 # Grids finer than this are drawn from a pre-rendered tile, and the rest line by line
+COLLISION_GRID_WIDTH = 80
+COLLISION_GRID_MANAGER = "flat" # "flat" (a sorted array cell index), "hash" (sets in tuple-keyed cells), or "hierarchical" (a flat grid per collider size)
+COLLISION_GRID_LEVELS = 3 # How many cell sizes a hierarchical grid has by default, halving from COLLISION_GRID_WIDTH
+COLLISION_GRID_CELL_COST = 2 # How many candidate colliders visiting one more cell is worth, for tuning the grids
+COLLISION_GRID_TUNE_INTERVAL = 600 # Hierarchical grids are re-tuned this many frames after the last tuning finished (0 to never re-tune)
+COLLISION_GRID_TRIAL_QUERIES = 8 # How many collider sized queries a tuned grid and the old one both answer each trial frame
+COLLISION_GRID_TRIAL_FRAMES = 30 # How many frames a tuned grid is tried for
+COLLISION_GRID_TRIAL_MARGIN = 0.9 # A tuned grid is only used if it took at most this much of the old grid's time (the median over the frames)
+COLLIDER_SLEEP_FRAMES = 30 # Colliders that haven't moved for this many collision checks fall asleep, and are only checked against ones that are awake
+COLLIDER_SLEEP_EPSILON = 0.01 # How far in pixels a collider can move and still count as not moving
+
+# Components preallocated for each system whenever a state is created. Others start empty.
+POOL_SIZES = {
+    "transform": 1024,
+    "physics": 1024,
+    "graphics": 1024,
+    "animator": 1024,
+    "life timer": 1024,
+    "collider": 256
+}
+POOL_GROWTH_THRESHOLD = 0.75 # Pools start growing in the background once they are this full
+POOL_GROWTH_STEP = 256 # Most components a pool grows by in the background each frame
+POOL_SHRINK_THRESHOLD = 0.2 # Pools are shrunk once they have been less than this full for a while
+POOL_SHRINK_DELAY = 600 # How many frames in a row a pool has to stay that empty before it is shrunk
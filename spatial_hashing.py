@@ -1,20 +1,181 @@
+import math
+import numpy as np
 import pygame
+import settings
 from pygame.math import Vector2
 
-class GridManager:
+class StaticCells:
+    """Colliders that have stopped moving are parked in static_contents instead of contents. Their
+    cells are only touched when they fall asleep or wake up, not every frame."""
+
+    def get_contents(self, collider):
+        """The cells that the collider is in right now."""
+        return self.static_contents if collider.asleep else self.contents
+    
+    def park_collider(self, collider):
+        """Moves a collider that has stopped moving into the static cells."""
+        self.switch_contents(collider, self.contents, self.static_contents)
+    
+    def wake_collider(self, collider):
+        """Moves a parked collider back to the cells that are updated every frame."""
+        self.switch_contents(collider, self.static_contents, self.contents)
+    
+    def switch_contents(self, collider, old_contents, new_contents):
+        for cell in collider.collision_cells:
+            cell_contents = old_contents.get(cell)
+            if cell_contents is not None:
+                cell_contents.discard(collider)
+                if not cell_contents:
+                    del old_contents[cell]
+            if cell in new_contents:
+                new_contents[cell].add(collider)
+            else:
+                new_contents[cell] = {collider}
+
+class SpatialQueries:
+    """Spatial queries that both grid managers share. They only visit the cells that overlap what is
+    being asked about. Cells are worked out as floor(position / cell_size), key() turns those into
+    whatever the grid uses for its cells, and get_colliders_in_cells() gives what's in them. Inactive
+    colliders are left out, and every query gives the entity ids of the colliders, closest first (ties by id).
+
+    The find_ functions give unsorted (distance, id) pairs, so that grids made of several grids can
+    combine them. `queries` and `candidates` count how many colliders the queries had to look at."""
+
+    def query_radius(self, pos, radius):
+        """Colliders that overlap the circle, sorted by how far their centers are from `pos`."""
+        return [id for distance, id in sorted(self.find_in_radius(pos, radius))]
+    
+    def query_rect(self, rect):
+        """Colliders that overlap the rectangle, sorted by how far their centers are from its center."""
+        return [id for distance, id in sorted(self.find_in_rect(rect))]
+    
+    def raycast(self, origin, direction, max_distance):
+        """Colliders that the ray hits within `max_distance`, sorted by how far along the ray they are hit."""
+        return [id for distance, id in sorted(self.find_on_ray(origin, direction, max_distance))]
+    
+    def get_candidates_per_query(self):
+        return self.candidates / self.queries if self.queries else 0
+
+    def get_center(self, collider):
+        transform = collider.transform_component
+        return transform.x + collider.offset.x, transform.y + collider.offset.y
+    
+    def get_colliders_in_area(self, left, top, right, bottom):
+        """Every active collider in the cells that the area covers, each one once."""
+        cell_size = self.cell_size
+        colliders = self.get_colliders_in_cells([self.key(x, y)
+            for x in range(math.floor(left / cell_size), math.floor(right / cell_size) + 1)
+            for y in range(math.floor(top / cell_size), math.floor(bottom / cell_size) + 1)])
+        self.queries += 1
+        self.candidates += len(colliders)
+        return [collider for collider in colliders if not collider.inactive]
+    
+    def find_in_radius(self, pos, radius):
+        pos_x, pos_y = pos
+        found = []
+        for collider in self.get_colliders_in_area(pos_x - radius, pos_y - radius, pos_x + radius, pos_y + radius):
+            x, y = self.get_center(collider)
+            distance = math.hypot(x - pos_x, y - pos_y)
+            if distance <= radius + collider.radius:
+                found.append((distance, collider.id))
+        return found
+    
+    def find_in_rect(self, rect):
+        rect = pygame.Rect(rect)
+        center_x, center_y = rect.center
+        found = []
+        for collider in self.get_colliders_in_area(rect.left, rect.top, rect.right, rect.bottom):
+            x, y = self.get_center(collider)
+            # The closest point of the rectangle to the circle
+            closest_x = min(max(x, rect.left), rect.right)
+            closest_y = min(max(y, rect.top), rect.bottom)
+            if (x - closest_x) ** 2 + (y - closest_y) ** 2 <= collider.radius ** 2:
+                found.append((math.hypot(x - center_x, y - center_y), collider.id))
+        return found
+    
+    def find_on_ray(self, origin, direction, max_distance):
+        """Only the cells that the ray passes through are visited, in order (Amanatides and Woo)."""
+        direction = Vector2(direction)
+        if direction.length_squared() == 0:
+            return []
+        direction.normalize_ip()
+        origin_x, origin_y = origin
+        cell_size = self.cell_size
+        cell_x, cell_y = math.floor(origin_x / cell_size), math.floor(origin_y / cell_size)
+        step_x = 1 if direction.x > 0 else -1
+        step_y = 1 if direction.y > 0 else -1
+        # How far along the ray the next cell border on each axis is, and how far apart they are
+        next_x = ((cell_x + (step_x > 0)) * cell_size - origin_x) / direction.x if direction.x else math.inf
+        next_y = ((cell_y + (step_y > 0)) * cell_size - origin_y) / direction.y if direction.y else math.inf
+        delta_x = cell_size / abs(direction.x) if direction.x else math.inf
+        delta_y = cell_size / abs(direction.y) if direction.y else math.inf
+
+        keys = []
+        while True:
+            keys.append(self.key(cell_x, cell_y))
+            if min(next_x, next_y) > max_distance:
+                break
+            if next_x < next_y:
+                cell_x += step_x
+                next_x += delta_x
+            else:
+                cell_y += step_y
+                next_y += delta_y
+
+        colliders = self.get_colliders_in_cells(keys)
+        found = []
+        for collider in colliders:
+            if collider.inactive:
+                continue
+            x, y = self.get_center(collider)
+            # Solves |origin + direction * distance - center| = radius for the first distance
+            to_origin_x, to_origin_y = origin_x - x, origin_y - y
+            b = to_origin_x * direction.x + to_origin_y * direction.y
+            c = to_origin_x ** 2 + to_origin_y ** 2 - collider.radius ** 2
+            if c > 0 and b > 0:
+                continue # Outside and pointing away
+            discriminant = b * b - c
+            if discriminant < 0:
+                continue
+            distance = max(-b - math.sqrt(discriminant), 0)
+            if distance <= max_distance:
+                found.append((distance, collider.id))
+        self.queries += 1
+        self.candidates += len(colliders)
+        return found
+
+class GridManager(StaticCells, SpatialQueries):
     def __init__(self, cell_size):
         """Takes the cell size for checking collisions"""
         self.cell_size = cell_size
         self.contents = {}
+        self.static_contents = {}
+        self.queries = 0
+        self.candidates = 0
     
     def clear(self):
         self.contents = {}
+        self.static_contents = {}
+    
+    def get_colliders_in_cells(self, keys):
+        """Every collider in the cells, each one once."""
+        colliders = set()
+        for key in keys:
+            for contents in (self.contents, self.static_contents):
+                cell_contents = contents.get(key)
+                if cell_contents:
+                    colliders.update(cell_contents)
+        return colliders
     
     def hash(self, pos):
         """Returns the coordinates representing which cell that location is within."""
         p = Vector2(pos)
         return int(p.x / self.cell_size), int(p.y / self.cell_size)
     
+    def key(self, cell_x, cell_y):
+        """Gives the cell that the floored cell coordinates are in. hash() rounds towards 0, so cells -1 and 0 are both 0."""
+        return (cell_x if cell_x >= 0 else cell_x + 1), (cell_y if cell_y >= 0 else cell_y + 1)
+    
     def get_cells_for_rect(self, rect):
         """Get every cell that the rectangle collides with."""
         min, max = self.hash(rect.topleft), self.hash(rect.bottomright)
@@ -24,13 +185,23 @@ class GridManager:
                 cells.append((x, y))
         return cells
     
+    def get_rect(self, collider):
+        """The collider's bounding square. A fast collider's covers its whole path since the last collision check."""
+        transform = collider.transform_component
+        x, y = transform.x + collider.offset.x, transform.y + collider.offset.y
+        left, right, top, bottom = x, x, y, y
+        if collider.fast:
+            left, right = min(left, collider.previous_x), max(right, collider.previous_x)
+            top, bottom = min(top, collider.previous_y), max(bottom, collider.previous_y)
+        # Rounded outwards, since Rect would cut off the fractions and miss part of the circle
+        left, top = math.floor(left - collider.radius), math.floor(top - collider.radius)
+        return pygame.Rect(left, top, math.ceil(right + collider.radius) - left, math.ceil(bottom + collider.radius) - top)
+    
     def insert_collider(self, collider):
         """Add the collider into the applicable cells under its collisions categories.
         These are all of the categories that the collider should check for collisions with.
         This allows only colliding with some objects, but not others."""
-        transform = collider.transform_component
-        origin = Vector2(transform.x, transform.y)
-        rect = pygame.Rect(origin + collider.offset - Vector2(collider.radius), (collider.radius * 2, collider.radius * 2))
+        rect = self.get_rect(collider)
         new_cells = []
         for cell in self.get_cells_for_rect(rect):
             self.contents.setdefault(cell, set()).add(collider)
@@ -39,9 +210,7 @@ class GridManager:
     
     def move_collider(self, collider):
         """Check to see if the rectangle is no longer in some cells, or needs to be added to others."""
-        transform = collider.transform_component
-        origin = Vector2(transform.x, transform.y)
-        rect = pygame.Rect(origin + collider.offset - Vector2(collider.radius), (collider.radius * 2, collider.radius * 2))
+        rect = self.get_rect(collider)
         old_cells = collider.collision_cells
         new_cells = set(self.get_cells_for_rect(rect))
         if new_cells != old_cells:
@@ -57,13 +226,313 @@ class GridManager:
             
         collider.collision_cells = set(new_cells)
     
+    def move_colliders(self, system, slots):
+        """Moves the colliders in `slots` of the ColliderSystem, one at a time."""
+        components = system.components
+        for slot in slots.tolist():
+            self.move_collider(components[slot])
+    
     def remove_collider(self, collider):
         """The collider needs to be removed from all cells."""
+        contents = self.get_contents(collider)
         collision_cells = collider.collision_cells
         for cell in collision_cells:
-            if collider in self.contents[cell]:
-                self.contents[cell].discard(collider)
-            if not self.contents[cell]:
-                del self.contents[cell]
+            if collider in contents[cell]:
+                contents[cell].discard(collider)
+            if not contents[cell]:
+                del contents[cell]
         
-        collider.collision_cells = set()
\ No newline at end of file
+        collider.collision_cells = set()
+    
+    def invalidate(self):
+        """The cells hold the colliders themselves, so it doesn't matter when they change slots."""
+        pass
+
+def get_cell_keys(low_x, low_y, high_x, high_y):
+    """Every cell that each box from cell (low_x, low_y) to cell (high_x, high_y) covers, as
+    (<box index>, <cell key>) arrays. The keys are the same as FlatGridManager.key gives."""
+    widths = high_x - low_x + 1
+    counts = widths * (high_y - low_y + 1)
+    owners = np.repeat(np.arange(len(low_x)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cell_x = low_x[owners] + offsets % widths[owners]
+    cell_y = low_y[owners] + offsets // widths[owners]
+    return owners, (cell_x + FlatGridManager.KEY_OFFSET) << 32 | (cell_y + FlatGridManager.KEY_OFFSET)
+
+class FlatGridManager(SpatialQueries):
+    """Does the same job as GridManager, but rather than keeping a set of colliders for each cell up
+    to date as every collider moves, it keeps an index of the cells in arrays. It's made from the
+    ColliderSystem's columns all at once: the (cell, collider) pairs are sorted by cell, so each
+    cell's colliders are next to each other, and the occupied cells are looked up by binary search.
+    Moving, adding, and removing colliders only marks the index as out of date, and it's made again
+    the next time it's queried. A cell is a single int instead of an (x, y) tuple.
+
+    Sleeping colliders are kept in the index like the rest, since making it costs the same either way."""
+
+    # Cell coordinates are offset to be positive and packed into one int as <x><y>, which fits in an int64
+    KEY_OFFSET = 1 << 30
+
+    def __init__(self, cell_size, radii=(-math.inf, math.inf)):
+        """Takes the cell size for checking collisions. Only the colliders with radii[0] < radius <= radii[1]
+        are put in the grid (see HierarchicalGridManager)."""
+        self.cell_size = cell_size
+        self.radii = radii
+        # The ColliderSystem and the category of the colliders, which are known once one is inserted
+        self.system = None
+        self.category = None
+        self.queries = 0
+        self.candidates = 0
+        self.builds = 0
+        self.clear()
+    
+    def clear(self):
+        # The sorted keys of the occupied cells, the slots of the colliders in each cell one cell after
+        # another, and where each cell's slots start (with the end of the last one at the end)
+        self.cell_keys = np.zeros(0, np.int64)
+        self.cell_slots = np.zeros(0, np.int64)
+        self.cell_starts = np.zeros(1, np.int64)
+        self.dirty = True
+    
+    def key(self, cell_x, cell_y):
+        """Packs the coordinates of a cell into one int."""
+        return (cell_x + self.KEY_OFFSET) << 32 | (cell_y + self.KEY_OFFSET)
+    
+    def hash(self, pos):
+        """Returns the key of the cell that location is within."""
+        return self.key(math.floor(pos[0] / self.cell_size), math.floor(pos[1] / self.cell_size))
+    
+    def build(self):
+        """Makes the index again from where the colliders are now. A fast collider covers its whole path
+        since the last collision check."""
+        self.dirty = False
+        self.builds += 1
+        system = self.system
+        if system is None:
+            return
+        live = system.live_count
+        columns = system.columns
+        radii = columns.radius[:live]
+        members = np.flatnonzero((columns.category[:live] == self.category) & (radii > self.radii[0]) & (radii <= self.radii[1]))
+        x, y = system.get_positions(members)
+        start_x, start_y = system.get_start_positions(members, x, y)
+        radii = radii[members]
+        cell_size = self.cell_size
+        owners, keys = get_cell_keys(
+            np.floor((np.minimum(x, start_x) - radii) / cell_size).astype(np.int64),
+            np.floor((np.minimum(y, start_y) - radii) / cell_size).astype(np.int64),
+            np.floor((np.maximum(x, start_x) + radii) / cell_size).astype(np.int64),
+            np.floor((np.maximum(y, start_y) + radii) / cell_size).astype(np.int64))
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        self.cell_slots = members[owners[order]]
+        # Where the key changes is where a new cell starts
+        starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        self.cell_starts = np.concatenate([[0], starts, [len(keys)]]) if len(keys) else np.zeros(1, np.int64)
+        self.cell_keys = keys[self.cell_starts[:-1]]
+    
+    def get_colliders_in_cells(self, keys):
+        """Every collider in the cells, each one once, in slot order."""
+        if self.dirty:
+            self.build()
+        if len(self.cell_keys) == 0:
+            return []
+        keys = np.array(keys, np.int64)
+        cells = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        cells = cells[self.cell_keys[cells] == keys]
+        starts = self.cell_starts[cells]
+        counts = self.cell_starts[cells + 1] - starts
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        slots = np.sort(self.cell_slots[positions])
+        # np.unique would do, but its first call imports numpy.ma, which takes a frame
+        slots = slots[np.concatenate([[True], slots[1:] != slots[:-1]])] if len(slots) else slots
+        components = self.system.components
+        return [components[slot] for slot in slots.tolist()]
+    
+    def attach(self, system, category):
+        """Makes the grid hold the colliders of `category` (an index into settings.COLLISION_CATEGORIES) in
+        the ColliderSystem `system`. Inserting a collider does the same, so this is only needed for a grid
+        that's made while its colliders already exist (see Game.tune_collision_grids)."""
+        self.system = system
+        self.category = category
+        self.dirty = True
+    
+    def insert_collider(self, collider):
+        self.attach(collider.game.get_systems()["collider"], collider.category)
+    
+    def move_collider(self, collider):
+        self.dirty = True
+    
+    def move_colliders(self, system, slots):
+        if len(slots):
+            self.dirty = True
+    
+    def remove_collider(self, collider):
+        self.dirty = True
+    
+    def park_collider(self, collider):
+        """Sleeping colliders are in the index like any other, so there's nothing to do."""
+        pass
+    
+    def wake_collider(self, collider):
+        pass
+    
+    def invalidate(self):
+        """The colliders have moved to different slots (ie the ColliderSystem was compacted)."""
+        self.dirty = True
+
+class HierarchicalGridManager:
+    """Several flat grids with different cell sizes. Each collider goes in the grid with the smallest cells
+    that its diameter fits in, so small particles don't share huge cells and big colliders aren't spread over
+    lots of small ones. Queries look through every level and combine the results."""
+
+    def __init__(self, cell_size, cell_sizes=None):
+        """By default there are settings.COLLISION_GRID_LEVELS levels, doubling in size up to `cell_size`."""
+        if cell_sizes is None:
+            cell_sizes = [cell_size / 2 ** level for level in reversed(range(settings.COLLISION_GRID_LEVELS))]
+        self.cell_size = cell_size
+        self.cell_sizes = sorted(cell_sizes)
+        # The same as get_level: a level holds the radii between half its cells and half the last level's
+        limits = [-math.inf] + [size / 2 for size in self.cell_sizes[:-1]] + [math.inf]
+        self.levels = [FlatGridManager(size, (low, high)) for size, low, high in zip(self.cell_sizes, limits, limits[1:])]
+    
+    def clear(self):
+        for level in self.levels:
+            level.clear()
+    
+    def get_level(self, radius):
+        for level, size in enumerate(self.cell_sizes):
+            if radius * 2 <= size:
+                return level
+        return len(self.cell_sizes) - 1
+    
+    def attach(self, system, category):
+        for level in self.levels:
+            level.attach(system, category)
+    
+    def insert_collider(self, collider):
+        for level in self.levels:
+            level.insert_collider(collider)
+    
+    def move_collider(self, collider):
+        for level in self.levels:
+            level.move_collider(collider)
+    
+    def move_colliders(self, system, slots):
+        for level in self.levels:
+            level.move_colliders(system, slots)
+    
+    def remove_collider(self, collider):
+        for level in self.levels:
+            level.remove_collider(collider)
+    
+    def park_collider(self, collider):
+        pass
+    
+    def wake_collider(self, collider):
+        pass
+    
+    def invalidate(self):
+        for level in self.levels:
+            level.invalidate()
+    
+    def query_radius(self, pos, radius):
+        return [id for distance, id in sorted(found for level in self.levels for found in level.find_in_radius(pos, radius))]
+    
+    def query_rect(self, rect):
+        return [id for distance, id in sorted(found for level in self.levels for found in level.find_in_rect(rect))]
+    
+    def raycast(self, origin, direction, max_distance):
+        return [id for distance, id in sorted(found for level in self.levels for found in level.find_on_ray(origin, direction, max_distance))]
+    
+    def get_candidates_per_query(self):
+        """Every level is searched for each query, so this adds up the levels."""
+        return sum(level.get_candidates_per_query() for level in self.levels)
+
+class GridTuner:
+    """Picks the cell sizes of a category's hierarchical grid from where its colliders are and how big they are.
+    Each power of 2 cell size is tried as the smallest level, with levels doubling until the biggest collider fits.
+    The one with the lowest cost wins, which is how many colliders a query the size of a collider has to look at,
+    plus how many cells it visits times settings.COLLISION_GRID_CELL_COST."""
+
+    def __init__(self, smallest=4, largest=1024):
+        self.sizes = []
+        size = smallest
+        while size <= largest:
+            self.sizes.append(size)
+            size *= 2
+    
+    def get_levels(self, base, radii):
+        levels = [base]
+        while levels[-1] < radii.max() * 2 and levels[-1] < self.sizes[-1]:
+            levels.append(levels[-1] * 2)
+        return levels
+    
+    def get_cells(self, x, y, radii, size):
+        """The cells that each bounding square covers, as (<collider index>, <cell key>) arrays."""
+        return get_cell_keys(np.floor((x - radii) / size).astype(np.int64), np.floor((y - radii) / size).astype(np.int64),
+            np.floor((x + radii) / size).astype(np.int64), np.floor((y + radii) / size).astype(np.int64))
+    
+    def estimate(self, x, y, radii, levels):
+        """Gives the average number of candidates and cells a radius query the size of a collider, at that
+        collider, would visit, over every collider. It counts them like SpatialQueries does: every level is
+        searched, and a level counts each collider in the query's cells once."""
+        level_sizes = np.array(levels)
+        # The same as HierarchicalGridManager.get_level
+        collider_levels = np.minimum(np.searchsorted(level_sizes, radii * 2), len(levels) - 1)
+        candidates = 0
+        cells = 0
+        for level, size in enumerate(levels):
+            query_owners, query_keys = self.get_cells(x, y, radii, size)
+            cells += len(query_keys)
+            members = np.flatnonzero(collider_levels == level)
+            if not len(members):
+                continue
+            owners, keys = self.get_cells(x[members], y[members], radii[members], size)
+            order = np.argsort(keys, kind="stable")
+            owners = owners[order]
+            keys = keys[order]
+            # Every (query, collider) pair that shares a cell, and then each pair once
+            starts = np.searchsorted(keys, query_keys, "left")
+            counts = np.searchsorted(keys, query_keys, "right") - starts
+            positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            pairs = np.sort(np.repeat(query_owners, counts) * len(members) + owners[positions])
+            candidates += np.count_nonzero(pairs[1:] != pairs[:-1]) + (len(pairs) > 0)
+        return candidates / len(x), cells / len(x)
+    
+    def tune(self, x, y, radii):
+        """Gives the best cell sizes for the colliders, how many candidates a query would look at, and the cost."""
+        for result in self.search(x, y, radii):
+            pass
+        return result
+    
+    def search(self, x, y, radii):
+        """Does the same as tune, a step at a time. Yields None after each layout it estimates, so the search
+        can be spread over several frames, and then yields what tune gives.
+
+        The cost only goes down and then up again as the smallest level grows, so the search starts from
+        the size of the median collider and only goes each way while the cost keeps going down, since
+        estimating the very small and very big sizes takes the longest."""
+        costs = {}
+        def get_cost(index):
+            levels = self.get_levels(self.sizes[index], radii)
+            candidates, cells = self.estimate(x, y, radii, levels)
+            costs[index] = (levels, candidates, candidates + cells * settings.COLLISION_GRID_CELL_COST)
+
+        median = np.sort(radii)[len(radii) // 2]
+        best = min(int(np.searchsorted(self.sizes, median * 2)), len(self.sizes) - 1)
+        get_cost(best)
+        yield None
+        for step in (-1, 1):
+            while 0 <= best + step < len(self.sizes):
+                get_cost(best + step)
+                yield None
+                if costs[best + step][2] >= costs[best][2]:
+                    break
+                best += step
+        yield costs[best]
+
+grid_managers = {
+    "hash":GridManager,
+    "flat":FlatGridManager,
+    "hierarchical":HierarchicalGridManager
+}
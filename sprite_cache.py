@@ -0,0 +1,79 @@
+import math
+import pygame
+from collections import OrderedDict
+
+class SpriteCache:
+    """Scaled and rotated copies of images, shared by everything that draws the same image. Angles are
+    rounded to one of `angles` steps around the circle and scales to a multiple of `scale_step`, so things
+    at almost the same angle and size reuse one surface instead of each making their own.
+
+    The least recently used surfaces are thrown away once they take up more than `max_bytes`."""
+
+    def __init__(self, angles=360, scale_step=0.05, max_bytes=64 * 1024 * 1024):
+        self.angles = angles
+        self.scale_step = scale_step
+        self.max_bytes = max_bytes
+        # (<source image>, <angle step>, <scale step>): <surface>, oldest first
+        self.surfaces = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def get_key(self, image, angle, scale):
+        angle_step = round(angle % 360 * self.angles / 360) % self.angles
+        scale_step = max(round(scale / self.scale_step), 1)
+        return (image, angle_step, scale_step)
+
+    def get(self, image, angle, scale):
+        """The image scaled by `scale` and then rotated `angle` degrees counterclockwise, like
+        pygame.transform.rotate, at the nearest cached angle and scale."""
+
+        key = self.get_key(image, angle, scale)
+        surfaces = self.surfaces
+        surface = surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.transform(*key)
+        surfaces[key] = surface
+        self.bytes += self.get_size(surface)
+        while self.bytes > self.max_bytes and len(surfaces) > 1:
+            old_key, old_surface = surfaces.popitem(last=False)
+            self.bytes -= self.get_size(old_surface)
+            self.evictions += 1
+        return surface
+
+    def transform(self, image, angle_step, scale_step):
+        scale = scale_step * self.scale_step
+        colorkey = image.get_colorkey()
+        width, height = image.get_size()
+        surface = pygame.transform.scale(image, (math.ceil(width * scale), math.ceil(height * scale)))
+        surface = pygame.transform.rotate(surface, angle_step * 360 / self.angles)
+        if colorkey:
+            surface.set_colorkey(colorkey)
+        return surface
+
+    def get_size(self, surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def clear(self):
+        self.surfaces.clear()
+        self.bytes = 0
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "surfaces":len(self.surfaces),
+            "bytes":self.bytes,
+            "hits":self.hits,
+            "misses":self.misses,
+            "evictions":self.evictions,
+            "hit rate":self.hits / lookups if lookups else 0
+        }
@@ -5,7 +5,7 @@ import sys
 import random
 import colors
 import time
-from main import Camera, create_game_instance
+from main import Camera, PropertyStore, create_game_instance
 from ui import Anchor
 
 class StateContainer:
@@ -13,15 +13,28 @@ class StateContainer:
         self.time_of_save = time.time()
         self.systems = {}
         self.component_index = {}
+        self.component_bits = {}
         self.system_index = []
 
         self.entities = {}
-        self.entity_props = {}
+        # Each entity's bitmask of which components it has. ie. transform and physics -> 0b11
+        self.signatures = {}
+        self.entity_props = PropertyStore(game.settings.ENTITY_PROPERTY_SCHEMA)
         self.living_entities = 0
-        self.last_id = 0
+        # Entity ids are recycled. Each slot has a generation that is bumped every time it's freed,
+        # the id currently living in it (or None), and freed slots are stacked to be reused.
+        self.id_generations = []
+        self.live_ids = []
+        self.free_id_slots = []
+        # Ids that have been given out but haven't had an entity created with them yet
+        self.unclaimed_ids = set()
 
         self.collision_maps = {}
 
+        # Cached game.query() results, and the queries each component name is part of
+        self.queries = {}
+        self.component_queries = {}
+
         self.actions = []
         self.camera = None
 
@@ -32,9 +45,13 @@ class StateContainer:
         # Maps components to the index they are stored at in the entities. ie{"transform":0,"physics":1}
         for i, component in enumerate(self.systems):
             self.component_index[component] = i
+            self.component_bits[component] = 1 << i
 
         self.system_index = [system for system in self.systems.values()]
 
+        for component, size in game.settings.POOL_SIZES.items():
+            self.systems[component].partition(game, size)
+
         for category in game.settings.COLLISION_CATEGORIES:
             self.collision_maps[category] = game.grid_manager(game.collision_grid_width)
         
@@ -52,6 +69,7 @@ class SceneManager:
     
     def start(self):
         self.state.start(self.game)
+        self.game.collect_garbage()
         self.run()
     
     def run(self):
@@ -73,6 +91,7 @@ class SceneManager:
         self.frame_time = current_time - self.last_time
         self.last_time = current_time
         self.game.dt = self.frame_time
+        self.game.frame += 1
 
         if self.state.switch:
             self.next_state(load_state=True)
@@ -83,17 +102,22 @@ class SceneManager:
             self.next_state(load_state=False)
         else:
             self.state.update(self.frame_time)
+        self.game.maintain_pools()
+        self.game.maintain_collision_grids()
     
     def next_state(self, load_state):
         next_state = self.state.next_state
         self.state.switch = False
         self.state.create = False
+        # Switching states is a pause anyway, so it's a good time to give back memory from spikes
+        self.game.compact()
         self.state.save_state()
         self.state = self.states[next_state]
         if load_state:
             self.state.load_state()
         else:
             self.state.start(self.game)
+        self.game.collect_garbage()
         
     
     def draw(self):
@@ -320,8 +344,7 @@ class Game(GameState):
     
     def draw(self):
         game = self.game
-        game.screen.fill(colors.white)
-        game.camera.draw_grid()
+        game.background.draw(game.screen, game.camera.corner)
         game.get_systems()["graphics"].update_and_draw()
         game.get_systems()["health bar"].update_and_draw()
         pygame.draw.rect(game.screen, colors.black, (1, 1, game.screen.get_width(), game.screen.get_height()), 3)
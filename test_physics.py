@@ -0,0 +1,107 @@
+import os
+# main sets up the mixer when it's imported, so it needs a device even when nothing is played
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import random
+import unittest
+import pygame
+import settings
+import state_machine # Has to be imported before main, since they import each other
+import main
+from pygame.math import Vector2
+
+'''
+Checks the batched PhysicsSystem against the original per-object integrator it replaced. Nothing
+here loads images or opens a window, so it runs on its own with `python -m unittest test_physics`.
+'''
+
+def spawn_bodies(game, amount, spawn_range=1000):
+    """Creates entities with only a transform and physics component, using a mix of the values
+    that players, bullets, shapes, and particles use."""
+
+    ids = []
+    for i in range(amount):
+        id = game.get_unique_id()
+        game.create_entity(id)
+        game.add_component(id, "transform", random.uniform(-spawn_range, spawn_range), random.uniform(-spawn_range, spawn_range), random.uniform(0, 360), 1)
+        speed = random.uniform(0, 500)
+        target_speed = random.choice([0, speed])
+        spin = random.choice([0, random.uniform(10, 50)])
+        accel, decel, friction = random.choice([
+            (settings.PLAYER_ACCEL, settings.PLAYER_DECEL, settings.PLAYER_FRICTION),
+            (1, 1, 0),
+            (1, 0.7, settings.PARTICLE_FRICTION),
+            (1, random.uniform(0.02, 0.1), settings.PARTICLE_FRICTION)
+        ])
+        game.add_component(id, "physics", random.uniform(0, 360), (speed, speed, target_speed), spin, accel, decel, friction,
+            game.get_component(id, "transform"), random.choice([True, False]))
+        ids.append(id)
+    return ids
+
+def reference_physics_step(bodies, dt):
+    """The original per-object integrator. `bodies` are dictionaries copied from physics components."""
+
+    for body in bodies:
+        if body["target velocity"] == Vector2(0, 0):
+            body["velocity"] = body["velocity"].lerp(body["target velocity"], body["decel"] * body["friction"])
+        else:
+            body["velocity"] = body["velocity"].lerp(body["target velocity"], body["accel"] - body["accel"] * body["friction"])
+
+        body["x"] += body["velocity"].x * dt
+        body["y"] += body["velocity"].y * dt
+
+        body["rotation"] += body["rotational force"] * 10 * dt
+        if body["rotation friction"] and body["rotational force"]:
+            v = Vector2(1, 0) * body["rotational force"]
+            v = v.lerp(Vector2(), min(body["rotational force"] * 0.05 * dt, 0.05))
+            body["rotational force"] = v.length()
+
+def copy_bodies(game, ids):
+    bodies = []
+    for id in ids:
+        transform = game.get_component(id, "transform")
+        physics = game.get_component(id, "physics")
+        bodies.append({
+            "id":id,
+            "x":float(transform.x),
+            "y":float(transform.y),
+            "rotation":float(transform.rotation),
+            "velocity":physics.velocity,
+            "target velocity":physics.target_velocity,
+            "accel":float(physics.accel),
+            "decel":float(physics.decel),
+            "friction":float(physics.friction),
+            "rotational force":float(physics.rotational_force),
+            "rotation friction":bool(physics.rotation_friction)
+        })
+    return bodies
+
+def get_max_error(game, bodies):
+    """The furthest any position, rotation, or velocity of the components is from the copied bodies."""
+
+    max_error = 0
+    for body in bodies:
+        transform = game.get_component(body["id"], "transform")
+        physics = game.get_component(body["id"], "physics")
+        max_error = max(max_error,
+            abs(transform.x - body["x"]),
+            abs(transform.y - body["y"]),
+            abs(transform.rotation - body["rotation"]),
+            (physics.velocity - body["velocity"]).length(),
+            abs(physics.rotational_force - body["rotational force"]))
+    return max_error
+
+class TestPhysics(unittest.TestCase):
+    def test_matches_per_object_integrator(self, amount=500, steps=120, dt=1 / 60, tolerance=1e-6):
+        random.seed(amount)
+        game = main.Game(pygame.Surface((1280, 720)), settings.COLLISION_GRID_WIDTH, None)
+        ids = spawn_bodies(game, amount)
+        bodies = copy_bodies(game, ids)
+        system = game.get_systems()["physics"]
+        for step in range(steps):
+            system.update(dt)
+            reference_physics_step(bodies, dt)
+        self.assertLessEqual(get_max_error(game, bodies), tolerance)
+
+if __name__ == "__main__":
+    unittest.main()